@@ -1,33 +1,139 @@
 import os
 import time
 import logging
-import requests
-import tempfile
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
-from flask import Flask, request, Response
-from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
-from langdetect import detect
-import backoff
-from openai import OpenAI, APIError
+from flask import Flask, request, Response, jsonify
+from session_store import Session, SessionStore, SqliteSessionStore
+from history import ConversationHistory, count_tokens
+from summarizer import Summarizer
+from keywords import KeywordMatcher
+from language import LanguageDetector
+from jobs import JobQueue
+from dedupe import MemoryDedupeCache, SqliteDedupeCache
+from media import MediaFetcher
+from caching import TranscriptCache, ResponseCache, content_hash
+from semantic_cache import SemanticCache
+from singleflight import SingleFlight
+from streaming import ParagraphStream
+from deadline import Deadline, DeadlineExceeded, retry
+from limiter import AdaptiveLimiter, LimitExceeded
+from breaker import CircuitBreaker, CircuitOpen
+from first_aid import first_aid_answer
+from hedging import HedgePolicy, hedged_call
+from keyed_lock import KeyedLock
+from debounce import Debouncer
 
 # ===== Load configuration =====
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE") or None
+ASYNC_REPLIES = os.getenv("ASYNC_REPLIES", "0") == "1"
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "0") == "1"
+REPLY_WORKERS = int(os.getenv("REPLY_WORKERS", 8))
+URGENT_REPLY_WORKERS = int(os.getenv("URGENT_REPLY_WORKERS", 2))
+MESSAGE_BURST_WINDOW = float(os.getenv("MESSAGE_BURST_WINDOW", 0))
+REPLY_QUEUE_SIZE = int(os.getenv("REPLY_QUEUE_SIZE", 1000))
+REPLY_DEADLINE = float(os.getenv("REPLY_DEADLINE", 12))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30))
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", 10))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 256))
+OPENAI_INITIAL_CONCURRENCY = int(os.getenv("OPENAI_INITIAL_CONCURRENCY", REPLY_WORKERS))
+OPENAI_LATENCY_TARGET = float(os.getenv("OPENAI_LATENCY_TARGET", 10))
+OPENAI_SLOT_WAIT = float(os.getenv("OPENAI_SLOT_WAIT", 1))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", 30))
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.9))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", 0.05))
+DEDUPE_TTL = int(os.getenv("DEDUPE_TTL", 600))
+DEDUPE_MAX_ENTRIES = int(os.getenv("DEDUPE_MAX_ENTRIES", 10_000))
+DEDUPE_WAIT = float(os.getenv("DEDUPE_WAIT", 10))
+DEDUPE_DB = os.getenv("DEDUPE_DB", "")
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", 16 * 1024 * 1024))
+MEDIA_CONNECT_TIMEOUT = float(os.getenv("MEDIA_CONNECT_TIMEOUT", 3.05))
+MEDIA_READ_TIMEOUT = float(os.getenv("MEDIA_READ_TIMEOUT", 15))
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", 10_000))
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR") or None
+TRANSCRIPT_CACHE_MAX_AGE = float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE", 7 * 24 * 3600))
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 3600))
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.8))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 100_000))
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
-app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("health_assistant")
 
+# ===== Lazily created API clients =====
+# openai, twilio.rest and requests are imported on first use, and each process
+# builds its own clients so forked workers never share a connection pool.
+# Retries are done by deadline.retry, not inside the OpenAI client.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _reset_clients():
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_clients)
+
+def _get_client(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def _create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, timeout=OPENAI_TIMEOUT, max_retries=0)
+
+def _create_twilio_client():
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client
+    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=TwilioHttpClient(timeout=TWILIO_TIMEOUT))
+    if TWILIO_API_BASE:
+        client.api.base_url = TWILIO_API_BASE
+    return client
+
+def get_openai_client():
+    return _get_client("openai", _create_openai_client)
+
+def get_twilio_client():
+    return _get_client("twilio", _create_twilio_client)
+
+def get_hedge_executor():
+    from concurrent.futures import ThreadPoolExecutor
+    return _get_client("hedge_executor", lambda: ThreadPoolExecutor(OPENAI_MAX_CONCURRENCY, "hedge"))
+
 # ===== User session tracking =====
-user_sessions = {}
 SESSION_TIMEOUT = 300  # 5 minutes
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 100_000))
+SESSION_DB = os.getenv("SESSION_DB", "")
+SESSION_COLD_AFTER = float(os.getenv("SESSION_COLD_AFTER", 60))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 20))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))
+SUMMARY_THRESHOLD_TOKENS = int(os.getenv("SUMMARY_THRESHOLD_TOKENS", 1000))
+SUMMARY_KEEP_TURNS = int(os.getenv("SUMMARY_KEEP_TURNS", 4))
+# With SESSION_DB set, every worker process sees the same conversations.
+if SESSION_DB:
+    user_sessions = SqliteSessionStore(SESSION_DB, ttl=SESSION_TIMEOUT, max_turns=HISTORY_MAX_TURNS)
+else:
+    user_sessions = SessionStore(
+        max_entries=MAX_SESSIONS, ttl=SESSION_TIMEOUT, cold_after=SESSION_COLD_AFTER or None, max_turns=HISTORY_MAX_TURNS
+    )
+# Messages from one user are answered one at a time, in arrival order, so two
+# quick messages never read the same session and overwrite each other's turn.
+user_locks = KeyedLock()
 
 # ===== Keywords and mappings =====
 EXIT_WORDS = ["bye", "no", "thanks", "thank you", "नहीं", "धन्यवाद", "stop", "exit", "band karo"]
@@ -57,6 +163,15 @@ MAP_KEYWORDS = [
     "show hospital", "find hospital", "अस्पताल", "डॉक्टर", "क्लिनिक", "स्वास्थ्य केंद्र", "मैप", "नक्शा"
 ]
 
+# Only goodbyes must be whole words ("no" is not "know"); the rest also match
+# inflected forms such as "burns", "poisoned" or "seizures".
+KEYWORDS = KeywordMatcher({
+    "exit": EXIT_WORDS,
+    "critical": CRITICAL_WORDS,
+    "map": MAP_KEYWORDS,
+    "specialist": SPECIALIST_MAP,
+}, whole_word=["exit"])
+
 EMERGENCY_MESSAGE = {
     "hi": "⚠️ तुरंत मदद लें! कृपया 108 पर कॉल करें या नजदीकी अस्पताल जाएं।",
     "en": "⚠️ This may be an emergency. Please call 108 or visit the nearest hospital.",
@@ -64,13 +179,11 @@ EMERGENCY_MESSAGE = {
     "bn": "⚠️ এটি একটি জরুরী পরিস্থিতি হতে পারে। দয়া করে 108 এ কল করুন বা নিকটস্থ হাসপাতালে যান।"
 }
 
+language_detector = LanguageDetector(supported=EMERGENCY_MESSAGE, default="en", cache_size=MAX_SESSIONS)
+
 # ===== Utility functions =====
-def detect_language(text):
-    try:
-        lang = detect(text)
-        return lang if lang in EMERGENCY_MESSAGE else "en"
-    except Exception:
-        return "en"
+def detect_language(text, user_id=None):
+    return language_detector.detect(text, user_id)
 
 def generate_maps_link(lang="en"):
     query = {
@@ -82,26 +195,90 @@ def generate_maps_link(lang="en"):
     return f"https://www.google.com/maps/search/?api=1&query={query.replace(' ', '+')}"
 
 def get_user_state(user_id):
+    """Read the session once per message; save_user_state writes it back."""
     state = user_sessions.get(user_id)
-    if state and time.time() - state["last_seen"] <= SESSION_TIMEOUT:
-        state["last_seen"] = time.time()
-        return state
-    return {"lang": None, "msg_count": 0, "last_seen": time.time(), "history": []}
-
-def download_media_as_bytes(media_url: str) -> bytes:
-    auth = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    response = requests.get(media_url.replace(".json", ""), auth=auth)
-    response.raise_for_status()
-    return response.content
-
-def transcribe_audio(media_url: str) -> str:
-    audio_bytes = download_media_as_bytes(media_url)
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp_audio:
-        tmp_audio.write(audio_bytes)
-        tmp_audio.flush()
-        with open(tmp_audio.name, "rb") as audio_file:
-            transcript = openai_client.audio.transcriptions.create(model="whisper-1", file=audio_file)
-    return transcript.text.strip()
+    if state is None:
+        state = Session(ConversationHistory(HISTORY_MAX_TURNS), last_seen=time.time())
+    return state
+
+def save_user_state(user_id, state, ended=False):
+    if ended:
+        user_sessions.pop(user_id, None)
+        # The next conversation may well be in another language.
+        language_detector.forget(user_id)
+        return
+    user_sessions[user_id] = state
+    # Only after the write, so the summary is folded into the saved session.
+    summarizer.maybe_schedule(user_id, state.history)
+
+media_fetcher = MediaFetcher(
+    auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+    connect_timeout=MEDIA_CONNECT_TIMEOUT,
+    read_timeout=MEDIA_READ_TIMEOUT,
+    max_bytes=MEDIA_MAX_BYTES,
+)
+
+transcripts = TranscriptCache(
+    max_entries=TRANSCRIPT_CACHE_SIZE, disk_dir=TRANSCRIPT_CACHE_DIR, max_disk_age=TRANSCRIPT_CACHE_MAX_AGE
+)
+
+def media_sid_from_url(media_url: str):
+    sid = media_url.replace(".json", "").rstrip("/").rsplit("/", 1)[-1]
+    return sid if sid.startswith("ME") else None
+
+# Concurrent OpenAI calls adapt to how the API is coping (see limiter.AdaptiveLimiter);
+# a call that cannot get a slot within OPENAI_SLOT_WAIT gets the fallback reply.
+def _openai_limiter():
+    # Start at about what the reply workers can use and let healthy calls grow it towards the cap.
+    return AdaptiveLimiter(
+        initial=min(OPENAI_INITIAL_CONCURRENCY, OPENAI_MAX_CONCURRENCY), max_limit=OPENAI_MAX_CONCURRENCY,
+        latency_target=OPENAI_LATENCY_TARGET, max_wait=OPENAI_SLOT_WAIT,
+    )
+
+chat_limiter = _openai_limiter()
+transcription_limiter = _openai_limiter()
+
+@lru_cache(maxsize=None)
+def _retryable_errors():
+    import requests
+    from openai import APIError
+    return (APIError, requests.exceptions.RequestException)
+
+def _is_outage(error):
+    # 5xx, 429, timeouts and connection errors; other 4xx are mistakes on our side.
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, _retryable_errors())
+
+# After BREAKER_FAILURES failed OpenAI calls in a row, stop calling it for
+# BREAKER_RESET seconds and answer from the caches and first-aid texts.
+openai_breaker = CircuitBreaker(failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET, is_failure=_is_outage)
+
+def transcribe_audio(media_url: str, deadline=None) -> str:
+    media_sid = media_sid_from_url(media_url)
+    text = transcripts.get_by_sid(media_sid)
+    if text is not None:
+        return text
+
+    audio, filename = media_fetcher.fetch(media_url.replace(".json", ""), deadline=deadline)
+    with audio:
+        digest = content_hash(audio)
+        text = transcripts.get(digest, media_sid)
+        if text is not None:
+            return text
+
+        def transcribe(timeout):
+            audio.seek(0)
+            with openai_breaker.guard(), transcription_limiter.slot(timeout) as timeout:
+                return get_openai_client().audio.transcriptions.create(
+                    model="whisper-1", file=(filename, audio), timeout=timeout
+                )
+
+        transcript = retry(transcribe, _retryable_errors(), deadline=deadline, default_timeout=OPENAI_TIMEOUT)
+    text = transcript.text.strip()
+    transcripts.put(digest, text, media_sid)
+    return text
 
 def build_system_prompt(lang: str):
     return (
@@ -110,87 +287,418 @@ def build_system_prompt(lang: str):
         "Keep replies short (3 paragraphs max). Use simple, human tone."
     )
 
-@backoff.on_exception(backoff.expo, (APIError, requests.exceptions.RequestException), max_tries=3)
-def ask_openai(user_id: str, message: str, lang: str):
-    state = user_sessions[user_id]
-    messages = [{"role": "system", "content": build_system_prompt(lang)}]
-    messages += state["history"]
-    messages.append({"role": "user", "content": message})
+def _create_chat_completion(messages, temperature, max_tokens, timeout):
+    with openai_breaker.guard(), chat_limiter.slot(timeout) as timeout:
+        response = get_openai_client().chat.completions.create(
+            model=OPENAI_MODEL, messages=messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout
+        )
+    return response.choices[0].message.content.strip()
 
-    response = openai_client.chat.completions.create(
-        model=OPENAI_MODEL, messages=messages, temperature=0.7, max_tokens=400
-    )
-    reply = response.choices[0].message.content.strip()
-    state["history"].append({"role": "assistant", "content": reply})
+# Slow chat completions for user questions get a backup request after the running
+# HEDGE_PERCENTILE latency; backups are capped at HEDGE_MAX_RATE of all requests.
+hedge_policy = HedgePolicy(percentile=HEDGE_PERCENTILE, max_rate=HEDGE_MAX_RATE) if HEDGE_REQUESTS else None
+
+def chat_completion(messages, temperature=0.7, max_tokens=400, deadline=None, hedge=False):
+    def attempt(timeout):
+        # The backup starts later, so each copy takes its timeout from the deadline when it starts.
+        call = lambda: _create_chat_completion(
+            messages, temperature, max_tokens, deadline.timeout(timeout) if deadline else timeout
+        )
+        if hedge and hedge_policy is not None:
+            return hedged_call(call, hedge_policy, get_hedge_executor())
+        return call()
+
+    return retry(attempt, _retryable_errors(), deadline=deadline, default_timeout=OPENAI_TIMEOUT)
+
+def stream_chat_completion(messages, paragraphs, temperature=0.7, max_tokens=400, deadline=None):
+    """chat_completion that hands every finished paragraph to paragraphs.deliver while the rest is generated.
+
+    Tried only once: after a paragraph has gone out, starting the completion
+    over would send it twice.
+    """
+    timeout = deadline.timeout(OPENAI_TIMEOUT) if deadline else OPENAI_TIMEOUT
+    parts = []
+    with openai_breaker.guard(), chat_limiter.slot(timeout) as timeout, get_openai_client().chat.completions.create(
+        model=OPENAI_MODEL, messages=messages, temperature=temperature, max_tokens=max_tokens,
+        stream=True, timeout=timeout,
+    ) as stream:
+        for chunk in stream:
+            if deadline:
+                deadline.timeout()
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                for paragraph in paragraphs.feed(delta):
+                    # deliver() never raises, so Twilio errors are not counted against OpenAI.
+                    paragraphs.deliver(paragraph)
+    return "".join(parts).strip()
+
+def summarize_turns(previous_summary: str, turns):
+    transcript = "\n".join(f"{role}: {content}" for role, content, _ in turns)
+    if previous_summary:
+        transcript = f"Earlier summary: {previous_summary}\n{transcript}"
+    summary = chat_completion([
+        {"role": "system", "content": (
+            "Summarize this health conversation in under 80 words. Keep symptoms, durations, "
+            "ages, medicines and advice already given. Write in the conversation's language."
+        )},
+        {"role": "user", "content": transcript},
+    ], temperature=0.2, max_tokens=150)
+    return summary, count_tokens(summary, OPENAI_MODEL)
+
+def snapshot_turns(user_id, history, keep):
+    # Read between two of the user's messages, never while one appends to it.
+    with user_locks.hold(user_id):
+        return history.oldest_turns(keep)
+
+def fold_summary(user_id, history, turns, summary, tokens):
+    # history may be a copy by now (SESSION_DB), so fold into whatever is stored,
+    # between two of the user's messages rather than under one of them.
+    with user_locks.hold(user_id):
+        user_sessions.update(user_id, lambda state: state.history.fold(turns, summary, tokens))
+
+# asgi.py swaps in its own snapshot_fn and fold_fn while it serves, since its turns hold asgi.user_locks.
+summarizer = Summarizer(
+    summarize_turns, threshold_tokens=SUMMARY_THRESHOLD_TOKENS, keep_turns=SUMMARY_KEEP_TURNS,
+    fold_fn=fold_summary, snapshot_fn=snapshot_turns,
+)
+
+response_cache = ResponseCache(max_bytes=RESPONSE_CACHE_BYTES, ttl=RESPONSE_CACHE_TTL)
+semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE) if SEMANTIC_CACHE else None
+
+def cached_reply(cache_key, message):
+    reply = response_cache.get(cache_key)
+    if reply is None and semantic_cache is not None:
+        reply = semantic_cache.get(cache_key[0], message)
+    return reply
+
+def cache_reply(cache_key, message, reply):
+    response_cache.put(cache_key, reply)
+    if semantic_cache is not None:
+        semantic_cache.put(cache_key[0], message, reply)
+
+# Identical opening questions that arrive together share one upstream call.
+opening_flights = SingleFlight()
+
+def complete_opening_question(cache_key, message, messages, deadline=None):
+    reply = chat_completion(messages, deadline=deadline, hedge=True)
+    cache_reply(cache_key, message, reply)
+    return reply
+
+def degraded_reply(message, lang):
+    """Answer with no network call while the OpenAI circuit is open, or None."""
+    return cached_reply(ResponseCache.key(lang, message), message) or first_aid_answer(message, lang)
+
+def prepare_openai_request(history, message: str, lang: str):
+    """Record the user turn and return (cache_key, cached_reply, messages).
+
+    cached_reply is None when the chat model has to be called with messages.
+    """
+    # Only opening questions are cached: later answers depend on the conversation so far.
+    cache_key = ResponseCache.key(lang, message) if not len(history) and not history.summary else None
+    history.append("user", message, count_tokens(message, OPENAI_MODEL))
+    if cache_key:
+        reply = cached_reply(cache_key, message)
+        if reply is not None:
+            return cache_key, reply, None
+
+    system_prompt = build_system_prompt(lang)
+    budget = HISTORY_TOKEN_BUDGET - count_tokens(system_prompt, OPENAI_MODEL)
+    messages = [{"role": "system", "content": system_prompt}]
+    if history.summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation: {history.summary}"})
+        budget -= history.summary_tokens
+    messages += history.window(budget)
+    return cache_key, None, messages
+
+def finish_openai_request(history, reply: str):
+    history.append("assistant", reply, count_tokens(reply, OPENAI_MODEL))
     return reply
 
+def ask_openai(history, message: str, lang: str, paragraphs=None, deadline=None):
+    cache_key, reply, messages = prepare_openai_request(history, message, lang)
+    if reply is None:
+        try:
+            if paragraphs is not None:
+                # Streamed replies are not coalesced: only the caller's chat gets the early paragraphs.
+                reply = stream_chat_completion(messages, paragraphs, deadline=deadline)
+                if cache_key:
+                    cache_reply(cache_key, message, reply)
+            elif cache_key:
+                reply = opening_flights.do(
+                    cache_key, lambda: complete_opening_question(cache_key, message, messages, deadline)
+                )
+            else:
+                reply = chat_completion(messages, deadline=deadline, hedge=True)
+        except CircuitOpen:
+            reply = degraded_reply(message, lang)
+            if reply is None:
+                raise
+    return finish_openai_request(history, reply)
+
 # ===== Main conversation logic =====
-def build_conversation_response(user_id, user_text):
-    state = get_user_state(user_id)
-    state["msg_count"] += 1
-    if not state["lang"]:
-        state["lang"] = detect_language(user_text)
-    lang = state["lang"]
-    user_sessions[user_id] = state
+def start_conversation_turn(user_id, user_text, state, hits=None):
+    """Update state and answer the keyword-only cases.
 
-    text_lower = user_text.lower().strip()
-    final_response = ""
+    hits is KEYWORDS.scan(user_text) when the caller already has it.
+    Returns (lang, hits, reply); reply is None when the chat model has to answer.
+    """
+    state.msg_count += 1
+    if not state.lang:
+        state.lang = detect_language(user_text, user_id)
+    lang = state.lang
 
-    if any(word in text_lower for word in EXIT_WORDS):
-        user_sessions.pop(user_id, None)
-        return "Conversation ended. You can message again anytime."
+    if hits is None:
+        hits = KEYWORDS.scan(user_text)
+
+    if "exit" in hits:
+        return lang, hits, "Conversation ended. You can message again anytime."
 
     # Emergency / critical cases
-    if any(word in text_lower for word in CRITICAL_WORDS):
-        specialists = []
-        for symptom, docs in SPECIALIST_MAP.items():
-            if symptom in text_lower:
-                specialists = docs
-                break
+    if "critical" in hits:
+        symptoms = hits.get("specialist", [])
+        specialists = next((docs for symptom, docs in SPECIALIST_MAP.items() if symptom in symptoms), [])
         emergency_text = EMERGENCY_MESSAGE.get(lang, EMERGENCY_MESSAGE["en"])
         doctor_info = f"👨‍⚕️ Recommended: {', '.join(specialists)}" if specialists else ""
         map_link = generate_maps_link(lang)
-        return f"{emergency_text}\n\n{doctor_info}\n🗺️ [Nearby Hospital]({map_link})"
+        return lang, hits, f"{emergency_text}\n\n{doctor_info}\n🗺️ [Nearby Hospital]({map_link})"
+
+    return lang, hits, None
 
-    # Normal conversation
-    reply = ask_openai(user_id, user_text, lang)
-    final_response += reply
+def finish_conversation_turn(lang, hits, reply):
+    final_response = reply
 
     # Show map if user asks directly
-    if any(keyword in text_lower for keyword in MAP_KEYWORDS):
+    if "map" in hits:
         map_link = generate_maps_link(lang)
         final_response += f"\n\n🗺️ [Nearby Hospital / Health Center]({map_link})"
 
     return final_response
 
-# ===== Flask routes =====
-@app.route("/whatsapp", methods=["POST"])
-def whatsapp_webhook():
-    from_number = request.form.get("From", "")
-    message_body = request.form.get("Body", "")
-    media_url = request.form.get("MediaUrl0")
-    num_media = int(request.form.get("NumMedia", 0))
-    reply_text = ""
+def build_conversation_response(user_id, user_text, paragraphs=None, deadline=None, save=True, hits=None):
+    state = get_user_state(user_id)
+    lang, hits, reply = start_conversation_turn(user_id, user_text, state, hits)
+    try:
+        if reply is None:
+            # Normal conversation
+            reply = ask_openai(state.history, user_text, lang, paragraphs, deadline)
+            reply = finish_conversation_turn(lang, hits, reply)
+    finally:
+        # Saved even when the answer failed, so the question and language are kept.
+        if save:
+            save_user_state(user_id, state, ended="exit" in hits)
+    return reply
+
+FALLBACK_MESSAGE = {
+    "hi": "क्षमा करें, मैं अभी जवाब तैयार नहीं कर सका। कृपया थोड़ी देर बाद अपना सवाल फिर से भेजें।",
+    "en": "Sorry, I couldn't prepare an answer right now. Please send your question again in a moment.",
+    "mr": "क्षमस्व, मी आत्ता उत्तर तयार करू शकलो नाही. कृपया थोड्या वेळाने तुमचा प्रश्न पुन्हा पाठवा.",
+    "bn": "দুঃখিত, আমি এখন উত্তর তৈরি করতে পারিনি। অনুগ্রহ করে কিছুক্ষণ পরে আবার আপনার প্রশ্ন পাঠান।"
+}
+
+def fallback_reply(user_id):
+    """Reply for a message that ran out of time or found OpenAI overloaded, in the user's language."""
+    state = user_sessions.get(user_id)
+    lang = state.lang if state and state.lang in FALLBACK_MESSAGE else "en"
+    map_link = generate_maps_link(lang)
+    return f"{FALLBACK_MESSAGE[lang]}\n\n{EMERGENCY_MESSAGE[lang]}\n🗺️ [Nearby Hospital]({map_link})"
 
+VOICE_ERROR_MESSAGE = "Sorry, I couldn't process your voice message. Please type your health question."
+
+def answer_message(from_number, message_body, media_url=None, num_media=0, paragraphs=None, deadline=None, save=True,
+                   hits=None):
     if num_media > 0 and media_url:
+        hits = None  # found in the caption, not in what was said
         try:
-            message_body = transcribe_audio(media_url)
+            message_body = transcribe_audio(media_url, deadline)
+        except (DeadlineExceeded, LimitExceeded, CircuitOpen):
+            raise
         except Exception as e:
             logger.error(f"Audio transcription failed: {e}")
-            message_body = "Sorry, I couldn't process your voice message."
+            return VOICE_ERROR_MESSAGE
 
     if not message_body.strip():
-        reply_text = "Please type or say your health question."
+        return "Please type or say your health question."
+    return build_conversation_response(from_number, message_body, paragraphs, deadline, save, hits)
+
+def process_message(from_number, message_body, media_url=None, num_media=0, paragraphs=None, deadline=None, hits=None):
+    """Answer one message; hits is KEYWORDS.scan(message_body) if the webhook already scanned it."""
+    if hits is None:
+        hits = KEYWORDS.scan(message_body)
+    try:
+        # Emergencies need no chat model, so they never queue behind the user's last
+        # question; while that is being answered its turn owns the session, and the
+        # emergency is answered without saving over it.  Goodbyes wait their turn:
+        # ending the session under a running turn would let its save bring it back.
+        if is_urgent(hits):
+            turn = user_locks.hold_if_free(from_number)
+        else:
+            turn = user_locks.hold(from_number, deadline)
+        with turn as owns_session:
+            return answer_message(
+                from_number, message_body, media_url, num_media, paragraphs, deadline, owns_session, hits
+            )
+    except DeadlineExceeded as e:
+        logger.warning(f"Reply to {from_number} ran out of time: {e}")
+        return fallback_reply(from_number)
+    except (LimitExceeded, CircuitOpen) as e:
+        logger.warning(f"OpenAI is unavailable, degraded reply to {from_number}: {e}")
+        return fallback_reply(from_number)
+
+# ===== Background replies over the Twilio REST API =====
+BUSY_MESSAGE = "We are receiving many messages right now. Please try again in a minute."
+ERROR_MESSAGE = "Sorry, something went wrong. Please try again."
+
+def send_reply(to_number, from_number, body):
+    get_twilio_client().messages.create(to=to_number, from_=from_number, body=body)
+
+def deliver_reply(message_sid, from_number, to_number, message_body, media_url, num_media, deadline=None, merged_sids=(),
+                  hits=None):
+    sids = [sid for sid in (message_sid, *merged_sids) if sid]
+    paragraphs = None
+    if STREAM_REPLIES:
+        # Finished paragraphs go out while OpenAI is still writing the rest.
+        paragraphs = ParagraphStream(send=lambda body: send_reply(from_number, to_number, body))
+    try:
+        reply_text = process_message(from_number, message_body, media_url, num_media, paragraphs, deadline, hits)
+    except Exception as e:
+        logger.error(f"Processing message from {from_number} failed: {e}")
+        for sid in sids:
+            message_replies.release(sid)
+        reply_text = ERROR_MESSAGE
     else:
-        reply_text = build_conversation_response(from_number, message_body)
+        for sid in sids:
+            message_replies.complete(sid, reply_text)
+        if paragraphs is not None:
+            reply_text = paragraphs.remainder(reply_text)
+    if reply_text:
+        send_reply(from_number, to_number, reply_text)
+
+# A user's messages are submitted with their number as key, so they are answered
+# in arrival order and a second one never ties up a worker waiting for the first.
+reply_jobs = JobQueue(workers=REPLY_WORKERS, max_pending=REPLY_QUEUE_SIZE, name="reply")
+# Fast lane: emergencies are answered from keywords alone, so they get their own
+# workers instead of waiting behind chat-model calls.  Goodbyes stay in the user's
+# line on reply_jobs: they must not overtake the question before them.
+urgent_reply_jobs = JobQueue(workers=URGENT_REPLY_WORKERS, max_pending=REPLY_QUEUE_SIZE, name="urgent-reply")
+
+def is_urgent(hits):
+    """An emergency, answerable at once (a goodbye mentioning one still ends the conversation)."""
+    return "critical" in hits and "exit" not in hits
+
+def holds_back(hits):
+    """Whether a text may wait in a burst; emergencies and goodbyes go out at once."""
+    return "critical" not in hits and "exit" not in hits
+
+def deliver_burst(from_number, messages):
+    """Answer text messages a user sent in quick succession ("fever", "since 3 days", ...) with one reply."""
+    sids = [sid for sid, _, _ in messages]
+    _, to_number, _ = messages[0]
+    message_body = "\n".join(body for _, _, body in messages)
+    # The burst window was spent waiting for the user, not on the answer, so the reply gets a full deadline.
+    deadline = Deadline(REPLY_DEADLINE)
+    if not reply_jobs.submit(
+        deliver_reply, sids[0], from_number, to_number, message_body, None, 0, deadline, sids[1:], key=from_number
+    ):
+        for sid in sids:
+            if sid:
+                message_replies.release(sid)
+        urgent_reply_jobs.submit(send_reply, from_number, to_number, BUSY_MESSAGE)
+
+# With MESSAGE_BURST_WINDOW set, text messages wait that long for the next one from
+# the same user, so a burst is answered by one chat-model call with the whole picture.
+message_bursts = Debouncer(deliver_burst, window=MESSAGE_BURST_WINDOW) if MESSAGE_BURST_WINDOW else None
+
+# ===== Idempotent processing of Twilio retries =====
+if DEDUPE_DB:
+    message_replies = SqliteDedupeCache(DEDUPE_DB, ttl=DEDUPE_TTL)
+else:
+    message_replies = MemoryDedupeCache(max_entries=DEDUPE_MAX_ENTRIES, ttl=DEDUPE_TTL)
+
+# ===== Flask routes =====
+def whatsapp_webhook():
+    from twilio.twiml.messaging_response import MessagingResponse
+
+    message_sid = request.form.get("MessageSid", "")
+    from_number = request.form.get("From", "")
+    to_number = request.form.get("To", "")
+    message_body = request.form.get("Body", "")
+    media_url = request.form.get("MediaUrl0")
+    num_media = int(request.form.get("NumMedia", 0))
+    deadline = Deadline(REPLY_DEADLINE)
+    # Scanned once here; the hits travel with the message.
+    hits = KEYWORDS.scan(message_body)
 
     resp = MessagingResponse()
-    resp.message(reply_text)
+    if ASYNC_REPLIES:
+        # Acknowledge Twilio right away; the answer is sent through the REST API.
+        # A retried delivery is already being answered, so it is only acknowledged.
+        if message_sid and not message_replies.claim(message_sid):
+            return Response(str(resp), mimetype="application/xml")
+        args = (message_sid, from_number, to_number, message_body, media_url, num_media, deadline, (), hits)
+        if message_bursts is not None:
+            if not num_media and holds_back(hits):
+                message_bursts.add(from_number, (message_sid, to_number, message_body))
+                return Response(str(resp), mimetype="application/xml")
+            # Voice notes, emergencies and goodbyes are not held back; the user's pending texts go on ahead.
+            message_bursts.flush(from_number)
+        if is_urgent(hits):
+            if not urgent_reply_jobs.submit(deliver_reply, *args):
+                # Never turn an emergency away: it needs no chat model, so answer it inline.
+                reply_text = process_message(from_number, message_body, deadline=deadline, hits=hits)
+                if message_sid:
+                    message_replies.complete(message_sid, reply_text)
+                resp.message(reply_text)
+        elif not reply_jobs.submit(deliver_reply, *args, key=from_number):
+            if message_sid:
+                message_replies.release(message_sid)
+            resp.message(BUSY_MESSAGE)
+    else:
+        reply_text, _ = message_replies.run(
+            message_sid,
+            lambda: process_message(from_number, message_body, media_url, num_media, deadline=deadline, hits=hits),
+            timeout=DEDUPE_WAIT,
+        )
+        if reply_text:
+            resp.message(reply_text)
     return Response(str(resp), mimetype="application/xml")
 
-@app.route("/", methods=["GET"])
+def collect_stats():
+    return {
+        "sessions": user_sessions.stats(),
+        "summarizer": summarizer.stats(),
+        "language": language_detector.stats(),
+        "reply_jobs": reply_jobs.stats(),
+        "urgent_reply_jobs": urgent_reply_jobs.stats(),
+        "message_replies": message_replies.stats(),
+        "transcripts": transcripts.stats(),
+        "responses": response_cache.stats(),
+        "semantic_responses": semantic_cache.stats() if semantic_cache else None,
+        "opening_flights": opening_flights.stats(),
+        "chat_limiter": chat_limiter.stats(),
+        "transcription_limiter": transcription_limiter.stats(),
+        "openai_breaker": openai_breaker.stats(),
+        "user_locks": user_locks.stats(),
+        "message_bursts": message_bursts.stats() if message_bursts else None,
+        "hedging": hedge_policy.stats() if hedge_policy else None,
+    }
+
+def stats():
+    return jsonify(collect_stats())
+
+INDEX_TEXT = "✅ AI Health Assistant (OpenAI) is running."
+
 def index():
-    return "✅ AI Health Assistant (OpenAI) is running."
+    return INDEX_TEXT
+
+def create_app():
+    flask_app = Flask(__name__)
+    flask_app.add_url_rule("/whatsapp", view_func=whatsapp_webhook, methods=["POST"])
+    flask_app.add_url_rule("/stats", view_func=stats, methods=["GET"])
+    flask_app.add_url_rule("/", view_func=index, methods=["GET"])
+    return flask_app
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)), debug=os.getenv("FLASK_DEBUG", "0") == "1")
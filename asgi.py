@@ -0,0 +1,487 @@
+"""asyncio entry point: the same bot as app.py served as a plain ASGI application.
+
+Run with an ASGI server, e.g. ``uvicorn asgi:app --port 5000``.  Sessions,
+caches, keyword and language logic are shared with app.py; only the network
+calls differ.  OpenAI is called through AsyncOpenAI, media is streamed with
+aiohttp and replies go out through Twilio's async REST client, so a single
+process holds thousands of conversations open without a thread each.
+"""
+import json
+import asyncio
+import logging
+import tempfile
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+import app as bot
+from caching import content_hash
+from dedupe import SqliteDedupeCache
+from session_store import SqliteSessionStore
+from media import AUDIO_EXTENSIONS, MediaTooLarge
+from singleflight import AsyncSingleFlight
+from streaming import ParagraphStream
+from deadline import Deadline, DeadlineExceeded, retry_async
+from jobs import LatencyWindow
+from limiter import AsyncAdaptiveLimiter, LimitExceeded
+from breaker import CircuitOpen
+from hedging import hedged_call_async
+from keyed_lock import AsyncKeyedLock
+from debounce import AsyncDebouncer
+
+logger = logging.getLogger("health_assistant")
+
+_http = {}
+_background = set()
+
+def _openai_limiter():
+    return AsyncAdaptiveLimiter(
+        initial=min(bot.OPENAI_INITIAL_CONCURRENCY, bot.OPENAI_MAX_CONCURRENCY), max_limit=bot.OPENAI_MAX_CONCURRENCY,
+        latency_target=bot.OPENAI_LATENCY_TARGET, max_wait=bot.OPENAI_SLOT_WAIT,
+    )
+
+chat_limiter = _openai_limiter()
+transcription_limiter = _openai_limiter()
+opening_flights = AsyncSingleFlight()
+user_locks = AsyncKeyedLock()
+# Time from webhook to the start of the background reply task, per priority.
+queue_waits = {"urgent": LatencyWindow(), "normal": LatencyWindow()}
+
+
+# ===== Lazily created async clients =====
+def _create_async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=bot.OPENAI_API_KEY, base_url=bot.OPENAI_BASE_URL, timeout=bot.OPENAI_TIMEOUT, max_retries=0
+    )
+
+def _create_async_twilio_client():
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+    from twilio.rest import Client
+    client = Client(bot.TWILIO_ACCOUNT_SID, bot.TWILIO_AUTH_TOKEN, http_client=AsyncTwilioHttpClient(timeout=bot.TWILIO_TIMEOUT))
+    if bot.TWILIO_API_BASE:
+        client.api.base_url = bot.TWILIO_API_BASE
+    return client
+
+def get_async_openai_client():
+    return bot._get_client("async_openai", _create_async_openai_client)
+
+def get_async_twilio_client():
+    return bot._get_client("async_twilio", _create_async_twilio_client)
+
+def get_http_session():
+    session = _http.get("session")
+    if session is None or session.closed:
+        import aiohttp
+        session = _http["session"] = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(bot.TWILIO_ACCOUNT_SID or "", bot.TWILIO_AUTH_TOKEN or ""),
+            connector=aiohttp.TCPConnector(limit=bot.media_fetcher.pool_size * 4),
+        )
+    return session
+
+async def close_clients():
+    session = _http.pop("session", None)
+    if session is not None:
+        await session.close()
+    client = bot._clients.pop("async_openai", None)
+    if client is not None:
+        await client.close()
+    client = bot._clients.pop("async_twilio", None)
+    if client is not None:
+        await client.http_client.close()
+
+
+# ===== Media and transcription =====
+async def fetch_media(url, deadline=None):
+    """Async version of MediaFetcher.fetch: (spooled buffer, filename)."""
+    import aiohttp
+
+    fetcher = bot.media_fetcher
+    connect_timeout, read_timeout = fetcher.timeout
+    timeout = aiohttp.ClientTimeout(
+        total=deadline.timeout() if deadline else None, sock_connect=connect_timeout, sock_read=read_timeout
+    )
+    async with get_http_session().get(url, timeout=timeout) as response:
+        response.raise_for_status()
+        if (response.content_length or 0) > fetcher.max_bytes:
+            raise MediaTooLarge(f"media is {response.content_length} bytes, limit is {fetcher.max_bytes}")
+        buffer = tempfile.SpooledTemporaryFile(max_size=fetcher.spool_bytes)
+        size = 0
+        try:
+            async for chunk in response.content.iter_chunked(fetcher.chunk_size):
+                size += len(chunk)
+                if size > fetcher.max_bytes:
+                    raise MediaTooLarge(f"media exceeds {fetcher.max_bytes} bytes")
+                buffer.write(chunk)
+        except BaseException:
+            buffer.close()
+            raise
+        content_type = (response.content_type or "").split(";")[0].strip()
+    buffer.seek(0)
+    return buffer, "audio" + AUDIO_EXTENSIONS.get(content_type, ".ogg")
+
+@lru_cache(maxsize=None)
+def _retryable_errors():
+    import aiohttp
+    from openai import APIError
+    return (APIError, aiohttp.ClientError)
+
+async def transcribe_audio(media_url: str, deadline=None) -> str:
+    media_sid = bot.media_sid_from_url(media_url)
+    text = bot.transcripts.get_by_sid(media_sid)  # memory only
+    if text is not None:
+        return text
+
+    audio, filename = await fetch_media(media_url.replace(".json", ""), deadline)
+    with audio:
+        digest = content_hash(audio)
+        # May read the disk tier, so it runs off the event loop like put.
+        text = await asyncio.to_thread(bot.transcripts.get, digest, media_sid)
+        if text is not None:
+            return text
+
+        async def transcribe(timeout):
+            audio.seek(0)
+            with bot.openai_breaker.guard():
+                async with transcription_limiter.slot(timeout) as timeout:
+                    return await get_async_openai_client().audio.transcriptions.create(
+                        model="whisper-1", file=(filename, audio), timeout=timeout
+                    )
+
+        transcript = await retry_async(
+            transcribe, _retryable_errors(), deadline=deadline, default_timeout=bot.OPENAI_TIMEOUT
+        )
+    text = transcript.text.strip()
+    await asyncio.to_thread(bot.transcripts.put, digest, text, media_sid)
+    return text
+
+
+# ===== Chat completions =====
+async def _create_chat_completion(messages, temperature, max_tokens, timeout):
+    with bot.openai_breaker.guard():
+        async with chat_limiter.slot(timeout) as timeout:
+            response = await get_async_openai_client().chat.completions.create(
+                model=bot.OPENAI_MODEL, messages=messages, temperature=temperature, max_tokens=max_tokens,
+                timeout=timeout,
+            )
+    return response.choices[0].message.content.strip()
+
+async def chat_completion(messages, temperature=0.7, max_tokens=400, deadline=None, hedge=False):
+    async def attempt(timeout):
+        call = lambda: _create_chat_completion(
+            messages, temperature, max_tokens, deadline.timeout(timeout) if deadline else timeout
+        )
+        if hedge and bot.hedge_policy is not None:
+            return await hedged_call_async(call, bot.hedge_policy)
+        return await call()
+
+    return await retry_async(attempt, _retryable_errors(), deadline=deadline, default_timeout=bot.OPENAI_TIMEOUT)
+
+async def stream_chat_completion(messages, paragraphs, temperature=0.7, max_tokens=400, deadline=None):
+    """Async version of app.stream_chat_completion; paragraphs.send is a coroutine function."""
+    timeout = deadline.timeout(bot.OPENAI_TIMEOUT) if deadline else bot.OPENAI_TIMEOUT
+    parts = []
+    with bot.openai_breaker.guard():
+        async with chat_limiter.slot(timeout) as timeout, await get_async_openai_client().chat.completions.create(
+            model=bot.OPENAI_MODEL, messages=messages, temperature=temperature, max_tokens=max_tokens,
+            stream=True, timeout=timeout,
+        ) as stream:
+            async for chunk in stream:
+                if deadline:
+                    deadline.timeout()
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    for paragraph in paragraphs.feed(delta):
+                        await paragraphs.deliver_async(paragraph)
+    return "".join(parts).strip()
+
+async def complete_opening_question(cache_key, message, messages, deadline=None):
+    reply = await chat_completion(messages, deadline=deadline, hedge=True)
+    bot.cache_reply(cache_key, message, reply)
+    return reply
+
+async def ask_openai(history, message: str, lang: str, paragraphs=None, deadline=None):
+    cache_key, reply, messages = bot.prepare_openai_request(history, message, lang)
+    if reply is None:
+        try:
+            if paragraphs is not None:
+                reply = await stream_chat_completion(messages, paragraphs, deadline=deadline)
+                if cache_key:
+                    bot.cache_reply(cache_key, message, reply)
+            elif cache_key:
+                reply = await opening_flights.do(
+                    cache_key, lambda: complete_opening_question(cache_key, message, messages, deadline)
+                )
+            else:
+                reply = await chat_completion(messages, deadline=deadline, hedge=True)
+        except CircuitOpen:
+            reply = bot.degraded_reply(message, lang)
+            if reply is None:
+                raise
+    return bot.finish_openai_request(history, reply)
+
+
+# ===== Conversation =====
+async def _sessions(method, *args):
+    # Like _dedupe: a shared session database is file I/O, so it runs off the event loop.
+    if isinstance(bot.user_sessions, SqliteSessionStore):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+async def build_conversation_response(user_id, user_text, paragraphs=None, deadline=None, save=True, hits=None):
+    state = await _sessions(bot.get_user_state, user_id)
+    lang, hits, reply = bot.start_conversation_turn(user_id, user_text, state, hits)
+    try:
+        if reply is None:
+            reply = await ask_openai(state.history, user_text, lang, paragraphs, deadline)
+            reply = bot.finish_conversation_turn(lang, hits, reply)
+    finally:
+        if save:
+            await _sessions(bot.save_user_state, user_id, state, "exit" in hits)
+    return reply
+
+# The summarizer works on its own thread.  While this app serves, its snapshot and
+# fold wait for the user's turn on the event loop like a message does, so a
+# turn's save can never write over a fold (app's hooks take app.user_locks,
+# which the turns here never hold).
+_loop = None
+
+async def _in_turn(user_id, method, *args):
+    async with user_locks.hold(user_id):
+        return await _sessions(method, *args)
+
+def _wait_for_turn(user_id, method, *args):
+    return asyncio.run_coroutine_threadsafe(_in_turn(user_id, method, *args), _loop).result()
+
+def snapshot_turns(user_id, history, keep):
+    return _wait_for_turn(user_id, history.oldest_turns, keep)
+
+def fold_summary(user_id, history, turns, summary, tokens):
+    fold = lambda state: state.history.fold(turns, summary, tokens)
+    _wait_for_turn(user_id, bot.user_sessions.update, user_id, fold)
+
+async def _answer_message(from_number, message_body, media_url, num_media, paragraphs, deadline, save, hits):
+    if num_media > 0 and media_url:
+        hits = None
+        try:
+            message_body = await transcribe_audio(media_url, deadline)
+        except (DeadlineExceeded, LimitExceeded, CircuitOpen):
+            raise
+        except Exception as e:
+            logger.error(f"Audio transcription failed: {e}")
+            return bot.VOICE_ERROR_MESSAGE
+
+    if not message_body.strip():
+        return "Please type or say your health question."
+    return await build_conversation_response(from_number, message_body, paragraphs, deadline, save, hits)
+
+async def _answer_in_turn(from_number, message_body, media_url, num_media, paragraphs, deadline, hits):
+    # As in app.process_message; the wait for the user's turn is bounded by process_message's wait_for.
+    if bot.is_urgent(hits):
+        turn = user_locks.hold_if_free(from_number)
+    else:
+        turn = user_locks.hold(from_number)
+    async with turn as owns_session:
+        return await _answer_message(
+            from_number, message_body, media_url, num_media, paragraphs, deadline, owns_session, hits
+        )
+
+async def process_message(from_number, message_body, media_url=None, num_media=0, paragraphs=None, deadline=None, hits=None):
+    # Per-call timeouts come from the deadline; wait_for also bounds everything between the calls.
+    if hits is None:
+        hits = bot.KEYWORDS.scan(message_body)
+    try:
+        return await asyncio.wait_for(
+            _answer_in_turn(from_number, message_body, media_url, num_media, paragraphs, deadline, hits),
+            deadline.remaining() if deadline else None,
+        )
+    except (DeadlineExceeded, asyncio.TimeoutError) as e:
+        logger.warning(f"Reply to {from_number} ran out of time: {e!r}")
+        return await _sessions(bot.fallback_reply, from_number)
+    except (LimitExceeded, CircuitOpen) as e:
+        logger.warning(f"OpenAI is unavailable, degraded reply to {from_number}: {e}")
+        return await _sessions(bot.fallback_reply, from_number)
+
+async def _dedupe(method, *args):
+    # The SQLite backend does file I/O; keep it off the event loop.
+    if isinstance(bot.message_replies, SqliteDedupeCache):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+async def wait_for_reply(message_sid):
+    deadline = asyncio.get_running_loop().time() + bot.DEDUPE_WAIT
+    while True:
+        found, reply = await _dedupe(bot.message_replies.lookup, message_sid)
+        if not found or reply is not None or asyncio.get_running_loop().time() >= deadline:
+            return reply
+        await asyncio.sleep(bot.message_replies.poll_interval)
+
+async def send_reply(to_number, from_number, body):
+    await get_async_twilio_client().messages.create_async(to=to_number, from_=from_number, body=body)
+
+async def deliver_reply(message_sid, from_number, to_number, message_body, media_url, num_media, deadline=None, merged_sids=(),
+                        hits=None):
+    sids = [sid for sid in (message_sid, *merged_sids) if sid]
+    paragraphs = None
+    if bot.STREAM_REPLIES:
+        paragraphs = ParagraphStream(send=lambda body: send_reply(from_number, to_number, body))
+    try:
+        reply_text = await process_message(from_number, message_body, media_url, num_media, paragraphs, deadline, hits)
+    except Exception as e:
+        logger.error(f"Processing message from {from_number} failed: {e}")
+        for sid in sids:
+            await _dedupe(bot.message_replies.release, sid)
+        reply_text = bot.ERROR_MESSAGE
+    else:
+        for sid in sids:
+            await _dedupe(bot.message_replies.complete, sid, reply_text)
+        if paragraphs is not None:
+            reply_text = paragraphs.remainder(reply_text)
+    if not reply_text:
+        return
+    try:
+        await send_reply(from_number, to_number, reply_text)
+    except Exception as e:
+        logger.error(f"Sending reply to {from_number} failed: {e}")
+
+async def _deliver_in_background(priority, enqueued_at, *args):
+    queue_waits[priority].record(asyncio.get_running_loop().time() - enqueued_at)
+    await deliver_reply(*args)
+
+def _start_delivery(priority, *args):
+    task = asyncio.create_task(_deliver_in_background(priority, asyncio.get_running_loop().time(), *args))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+def _deliver_burst(from_number, messages):
+    # As app.deliver_burst: one reply to a burst of text messages, with a deadline starting now.
+    sids = [sid for sid, _, _ in messages]
+    _, to_number, _ = messages[0]
+    message_body = "\n".join(body for _, _, body in messages)
+    deadline = Deadline(bot.REPLY_DEADLINE)
+    _start_delivery("normal", sids[0], from_number, to_number, message_body, None, 0, deadline, sids[1:])
+
+message_bursts = AsyncDebouncer(_deliver_burst, window=bot.MESSAGE_BURST_WINDOW) if bot.MESSAGE_BURST_WINDOW else None
+
+async def whatsapp_webhook(form):
+    from twilio.twiml.messaging_response import MessagingResponse
+
+    message_sid = form.get("MessageSid", "")
+    from_number = form.get("From", "")
+    to_number = form.get("To", "")
+    message_body = form.get("Body", "")
+    media_url = form.get("MediaUrl0")
+    num_media = int(form.get("NumMedia", 0))
+    deadline = Deadline(bot.REPLY_DEADLINE)
+    hits = bot.KEYWORDS.scan(message_body)
+
+    resp = MessagingResponse()
+    if message_sid and not await _dedupe(bot.message_replies.claim, message_sid):
+        # A retried delivery: in async-reply mode the original task answers it.
+        if not bot.ASYNC_REPLIES:
+            reply_text = await wait_for_reply(message_sid)
+            if reply_text:
+                resp.message(reply_text)
+        return str(resp)
+
+    if bot.ASYNC_REPLIES:
+        # Emergencies need no chat model and are never turned away.  Every other
+        # message, goodbyes included, reaches user_locks in the order its task was
+        # started, so a user's messages are answered in arrival order.
+        priority = "urgent" if bot.is_urgent(hits) else "normal"
+        if priority == "normal" and len(_background) >= bot.REPLY_QUEUE_SIZE:
+            if message_sid:
+                await _dedupe(bot.message_replies.release, message_sid)
+            resp.message(bot.BUSY_MESSAGE)
+            return str(resp)
+        if message_bursts is not None:
+            if not num_media and bot.holds_back(hits):
+                message_bursts.add(from_number, (message_sid, to_number, message_body))
+                return str(resp)
+            # Voice notes, emergencies and goodbyes are not held back; the user's pending texts go on ahead.
+            message_bursts.flush(from_number)
+        _start_delivery(
+            priority, message_sid, from_number, to_number, message_body, media_url, num_media, deadline, (), hits
+        )
+        return str(resp)
+
+    try:
+        reply_text = await process_message(from_number, message_body, media_url, num_media, deadline=deadline, hits=hits)
+    except Exception:
+        if message_sid:
+            await _dedupe(bot.message_replies.release, message_sid)
+        raise
+    if message_sid:
+        await _dedupe(bot.message_replies.complete, message_sid, reply_text)
+    resp.message(reply_text)
+    return str(resp)
+
+
+# ===== ASGI plumbing =====
+def collect_stats():
+    stats = bot.collect_stats()
+    stats["async_opening_flights"] = opening_flights.stats()
+    stats["async_user_locks"] = user_locks.stats()
+    stats["async_message_bursts"] = message_bursts.stats() if message_bursts else None
+    stats["async_background_replies"] = len(_background)
+    stats["async_chat_limiter"] = chat_limiter.stats()
+    stats["async_transcription_limiter"] = transcription_limiter.stats()
+    stats["async_queue_wait"] = {priority: waits.stats() for priority, waits in queue_waits.items()}
+    return stats
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def _respond(send, status, body, content_type):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _lifespan(receive, send):
+    global _loop
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _loop = asyncio.get_running_loop()
+            bot.summarizer.snapshot_fn, bot.summarizer.fold_fn = snapshot_turns, fold_summary
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            bot.summarizer.snapshot_fn, bot.summarizer.fold_fn = bot.snapshot_turns, bot.fold_summary
+            await close_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if path == "/whatsapp" and method == "POST":
+        body = await _read_body(receive)
+        form = {key: values[0] for key, values in parse_qs(body.decode("utf-8"), keep_blank_values=True).items()}
+        try:
+            xml = await whatsapp_webhook(form)
+        except Exception as e:
+            logger.error(f"Webhook failed: {e}")
+            await _respond(send, 500, "Internal Server Error", "text/plain")
+            return
+        await _respond(send, 200, xml, "application/xml")
+    elif path == "/stats" and method == "GET":
+        await _respond(send, 200, json.dumps(collect_stats()), "application/json")
+    elif path == "/" and method == "GET":
+        await _respond(send, 200, bot.INDEX_TEXT, "text/plain; charset=utf-8")
+    else:
+        await _respond(send, 404, "Not Found", "text/plain")
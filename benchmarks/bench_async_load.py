@@ -0,0 +1,153 @@
+"""Load test: thread-pooled Flask app versus the ASGI app under the same upstream latency.
+
+A local fake OpenAI server answers every chat completion after --latency
+seconds.  The Flask app is driven from a pool of --threads worker threads
+(what a threaded server gives you); the ASGI app is driven from one event
+loop with every request in flight at once.  All requests arrive as one
+burst and latency is measured from the start of the burst.  Each request
+is a distinct user with a distinct question, so caches and coalescing do
+not help.
+
+Usage: python benchmarks/bench_async_load.py [--requests 1000] [--threads 32] [--latency 2.0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_openai(port, latency):
+    from aiohttp import web
+
+    async def chat(request):
+        payload = await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Drink fluids and rest."}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = web.Application()
+        server.router.add_post("/v1/chat/completions", chat)
+        runner = web.AppRunner(server, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port, backlog=4096).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+
+
+def form(prefix, i):
+    return {"From": f"whatsapp:+{prefix}{i:09d}", "Body": f"I have had a mild headache for {i} hours (run {prefix})"}
+
+
+def report(label, latencies, elapsed):
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"{label:<26} {len(latencies) / elapsed:>9.1f} req/s  p50 {statistics.median(latencies):6.2f} s  "
+          f"p99 {p99:6.2f} s  wall {elapsed:6.2f} s")
+
+
+def run_sync(bot, requests, threads):
+    client = bot.app.test_client()
+    latencies = []
+    lock = threading.Lock()
+    begin = time.perf_counter()
+
+    def one(i):
+        response = client.post("/whatsapp", data=form(1, i))
+        assert response.status_code == 200
+        with lock:
+            latencies.append(time.perf_counter() - begin)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(requests)))
+    return latencies, time.perf_counter() - begin
+
+
+async def asgi_post(asgi_app, data):
+    body = urlencode(data).encode()
+    delivered = False
+    status = {}
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await asgi_app({"type": "http", "method": "POST", "path": "/whatsapp", "headers": []}, receive, send)
+    return status["code"]
+
+
+async def run_async(asgi, requests):
+    begin = time.perf_counter()
+    latencies = []
+
+    async def one(i):
+        assert await asgi_post(asgi.app, form(2, i)) == 200
+        latencies.append(time.perf_counter() - begin)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - begin
+    await asgi.close_clients()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=32, help="worker threads for the Flask app")
+    parser.add_argument("--latency", type=float, default=2.0, help="fake OpenAI latency in seconds")
+    args = parser.parse_args()
+
+    port = free_port()
+    start_fake_openai(port, args.latency)
+    os.environ.update({"OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1", "OPENAI_API_KEY": "bench"})
+    os.environ.setdefault("MAX_SESSIONS", str(args.requests * 2 + 10))
+    os.environ.setdefault("OPENAI_MAX_CONCURRENCY", str(args.requests))
+
+    import logging
+    logging.disable(logging.INFO)
+    import app as bot
+    import asgi
+
+    print(f"{args.requests} requests, upstream latency {args.latency}s\n")
+    latencies, elapsed = run_sync(bot, args.requests, args.threads)
+    report(f"Flask ({args.threads} threads)", latencies, elapsed)
+    latencies, elapsed = asyncio.run(run_async(asgi, args.requests))
+    report("ASGI (1 event loop)", latencies, elapsed)
+    print("\n" + json.dumps(bot.collect_stats()["sessions"]))
+
+
+if __name__ == "__main__":
+    main()
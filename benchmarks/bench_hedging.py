@@ -0,0 +1,130 @@
+"""Tail latency of chat completions with and without hedged requests.
+
+A local fake OpenAI server answers most requests in 100-300 ms, but a
+--slow fraction takes --slow-latency seconds, chosen at random per request
+as a stand-in for a slow upstream replica.  The same workload runs through
+app.chat_completion from a pool of threads and through asgi.chat_completion
+on one event loop, first without hedging and then with it.
+
+Usage: python benchmarks/bench_hedging.py [--requests 600] [--slow 0.08] [--slow-latency 2.0] [--max-rate 0.1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_openai(port, slow, slow_latency, seed=7):
+    from aiohttp import web
+
+    rng = random.Random(seed)
+
+    async def chat(request):
+        payload = await request.json()
+        await asyncio.sleep(slow_latency if rng.random() < slow else rng.uniform(0.1, 0.3))
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Drink fluids and rest."}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = web.Application()
+        server.router.add_post("/v1/chat/completions", chat)
+        runner = web.AppRunner(server, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+
+
+MESSAGES = [{"role": "user", "content": "I have a mild headache"}]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    return f"p50 {pick(0.5):7.0f} ms  p90 {pick(0.9):7.0f} ms  p99 {pick(0.99):7.0f} ms"
+
+
+def run_threads(bot, requests, concurrency):
+    def one(_):
+        started = time.perf_counter()
+        bot.chat_completion(MESSAGES, hedge=True)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+async def run_async(asgi, requests, concurrency):
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            await asgi.chat_completion(MESSAGES, hedge=True)
+            return time.perf_counter() - started
+
+    latencies = await asyncio.gather(*(one() for _ in range(requests)))
+    await asgi.close_clients()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--slow", type=float, default=0.08, help="fraction of slow upstream responses")
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--percentile", type=float, default=0.9)
+    parser.add_argument("--max-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    port = free_port()
+    start_fake_openai(port, args.slow, args.slow_latency)
+    os.environ.update({"OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1", "OPENAI_API_KEY": "bench"})
+
+    import logging
+    logging.disable(logging.WARNING)
+    import app as bot
+    import asgi
+    from hedging import HedgePolicy
+
+    bot.chat_completion(MESSAGES)  # create the client outside the timings
+    print(f"{args.requests} requests, {args.concurrency} at a time, {args.slow:.0%} take {args.slow_latency}s\n")
+    for label, runner in (("threads", lambda: run_threads(bot, args.requests, args.concurrency)),
+                          ("asyncio", lambda: asyncio.run(run_async(asgi, args.requests, args.concurrency)))):
+        bot.hedge_policy = None
+        print(f"{label:<8} no hedging   {percentiles(runner())}")
+        bot.hedge_policy = policy = HedgePolicy(percentile=args.percentile, max_rate=args.max_rate)
+        runner()  # warm up the latency window
+        policy.requests = policy.hedges = policy.hedge_wins = 0
+        latencies = runner()
+        print(f"{label:<8} hedged       {percentiles(latencies)}  "
+              f"(hedge rate {policy.hedges / policy.requests:.1%}, backup won {policy.hedge_wins})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare the KeywordMatcher automaton with the old per-list substring scans.
+
+Usage: python benchmarks/bench_keywords.py [--extra-keywords 3000] [--iterations 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from keywords import KeywordMatcher
+
+EXIT_WORDS = ["bye", "no", "thanks", "thank you", "नहीं", "धन्यवाद", "stop", "exit", "band karo"]
+CRITICAL_WORDS = [
+    "chest pain", "severe bleeding", "unconscious", "heart attack", "stroke",
+    "fainting", "shortness of breath", "vomiting blood", "fracture", "seizure",
+    "poison", "snake bite", "burn", "head injury", "coma", "drowning", "electrocution"
+]
+MAP_KEYWORDS = [
+    "map", "hospital", "clinic", "doctor near", "nearby doctor", "health center",
+    "medical center", "pharmacy near", "ambulance", "nearest clinic", "hospital location",
+    "show hospital", "find hospital", "अस्पताल", "डॉक्टर", "क्लिनिक", "स्वास्थ्य केंद्र", "मैप", "नक्शा"
+]
+SPECIALIST_MAP = {"chest pain": ["Cardiologist"], "fracture": ["Orthopedic Doctor"], "burn": ["Plastic Surgeon"]}
+
+MESSAGES = [
+    "I have had a fever and headache since yesterday, what should I do?",
+    "मुझे बुखार है और सिर दर्द हो रहा है।",
+    "my father has chest pain and is sweating a lot, where is the nearest clinic",
+    "I don't know why my child keeps coughing at night",
+    "thank you",
+]
+
+
+def synthetic_keywords(count, rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyzअआइईउऊएऐओकखगघचछजझटठडढतथदधनपफबभमयरलवशसह"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 14))) for _ in range(count)]
+
+
+def substring_scan(text, lists, specialist_map):
+    text_lower = text.lower().strip()
+    hits = [any(word in text_lower for word in words) for words in lists]
+    for symptom in specialist_map:
+        if symptom in text_lower:
+            break
+    return hits
+
+
+def bench(label, fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(MESSAGES[i % len(MESSAGES)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e6:8.2f} us/message")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--extra-keywords", type=int, default=3000, help="synthetic keywords added per list")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for extra in sorted({0, args.extra_keywords}):
+        lists = [
+            EXIT_WORDS + synthetic_keywords(extra, rng),
+            CRITICAL_WORDS + synthetic_keywords(extra, rng),
+            MAP_KEYWORDS + synthetic_keywords(extra, rng),
+        ]
+        specialist_map = dict(SPECIALIST_MAP, **{word: [] for word in synthetic_keywords(extra, rng)})
+        start = time.perf_counter()
+        matcher = KeywordMatcher({
+            "exit": lists[0], "critical": lists[1], "map": lists[2], "specialist": specialist_map,
+        })
+        print(f"\n{sum(map(len, lists)) + len(specialist_map):,} keywords "
+              f"(automaton compiled in {(time.perf_counter() - start) * 1e3:.1f} ms)")
+        bench("substring scans", lambda text: substring_scan(text, lists, specialist_map), args.iterations)
+        bench("KeywordMatcher.scan", matcher.scan, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Emergency reply latency while the chat-model queue is deep.
+
+Runs the Flask app with ASYNC_REPLIES=1 against a local fake OpenAI server
+that takes --latency seconds per completion.  First --backlog ordinary
+questions are posted, which keeps every reply worker busy, then --urgent
+"chest pain" messages arrive one every few milliseconds.  The time from the
+webhook to the reply being handed to Twilio is measured for each of them
+(Twilio itself is not called).  --single-lane sends emergencies through the
+ordinary queue, which is how the bot behaved before the fast lane.
+
+Usage: python benchmarks/bench_priority.py [--backlog 500] [--urgent 200] [--latency 1.0] [--single-lane]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_openai(port, latency):
+    from aiohttp import web
+
+    async def chat(request):
+        payload = await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Drink fluids and rest."}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = web.Application()
+        server.router.add_post("/v1/chat/completions", chat)
+        runner = web.AppRunner(server, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backlog", type=int, default=500)
+    parser.add_argument("--urgent", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="fake OpenAI latency in seconds")
+    parser.add_argument("--single-lane", action="store_true", help="send emergencies through the ordinary queue")
+    args = parser.parse_args()
+
+    port = free_port()
+    start_fake_openai(port, args.latency)
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1", "OPENAI_API_KEY": "bench",
+        "ASYNC_REPLIES": "1", "REPLY_QUEUE_SIZE": str(args.backlog + args.urgent + 10),
+        "REPLY_DEADLINE": "3600",
+    })
+
+    import logging
+    logging.disable(logging.WARNING)
+    import app as bot
+
+    if args.single_lane:
+        bot.is_urgent = lambda hits: False
+    posted = {}
+    answered = {}
+
+    def send_reply(to_number, from_number, body):
+        answered[to_number] = time.perf_counter()
+
+    bot.send_reply = send_reply
+    client = bot.app.test_client()
+
+    for i in range(args.backlog):
+        client.post("/whatsapp", data={"From": f"whatsapp:+1{i:09d}", "Body": f"I have had a mild cough for {i} days"})
+    time.sleep(0.2)
+    for i in range(args.urgent):
+        number = f"whatsapp:+2{i:09d}"
+        posted[number] = time.perf_counter()
+        client.post("/whatsapp", data={"From": number, "Body": "My father has chest pain"})
+        time.sleep(0.005)
+
+    while len([n for n in posted if n in answered]) < len(posted):
+        time.sleep(0.01)
+    latencies = sorted((answered[n] - posted[n]) * 1000 for n in posted)
+    print(f"{'single lane' if args.single_lane else 'fast lane'}: {args.urgent} emergencies behind "
+          f"{args.backlog} queued questions ({bot.REPLY_WORKERS} workers, {args.latency}s upstream)")
+    print(f"  emergency reply  p50 {latencies[len(latencies) // 2]:8.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:8.1f} ms  max {latencies[-1]:8.1f} ms")
+    stats = bot.collect_stats()
+    print("  queue wait " + json.dumps({lane: stats[lane]["queue_wait"] for lane in ("reply_jobs", "urgent_reply_jobs")}))
+
+
+if __name__ == "__main__":
+    main()
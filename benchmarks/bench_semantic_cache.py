@@ -0,0 +1,116 @@
+"""Recall versus lookup latency of SemanticCache on synthetic health questions.
+
+Fills the cache with distinct generated questions, then looks up lightly
+reworded copies (typos, dropped or added filler words) of cached ones.
+A lookup counts as recalled when it returns the answer of the question it
+was derived from.
+
+Usage: python benchmarks/bench_semantic_cache.py [--entries 1000000] [--queries 5000]
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from semantic_cache import SemanticCache
+
+PEOPLE = ["I", "my son", "my daughter", "my mother", "my father", "my wife", "my husband", "my baby", "grandfather"]
+SYMPTOMS = [
+    "fever", "cough", "headache", "cold", "body pain", "vomiting", "loose motion", "stomach pain",
+    "rash", "itching", "sore throat", "back pain", "dizziness", "weakness", "ear pain", "tooth pain",
+    "burning urine", "joint pain", "swelling in leg", "eye redness", "acidity", "constipation",
+]
+DURATIONS = [f"since {n} {unit}" for n in range(1, 15) for unit in ("days", "weeks", "hours")] + ["since morning", "since yesterday"]
+FILLERS = ["please help", "what to do", "what should i do", "is it serious", "which medicine", "kindly advise"]
+
+
+# Free-text detail (villages, medicines, foods...) that makes real questions distinct.
+DETAIL = ["".join(random.Random(n).choice("aeioubcdfghjklmnprstvy") for _ in range(random.Random(n).randint(4, 9)))
+          for n in range(3000)]
+
+
+def question(rng):
+    first, second = rng.sample(SYMPTOMS, 2)
+    verb = "have" if rng.random() < 0.5 else "has"
+    detail = " ".join(rng.sample(DETAIL, 2))
+    return f"{rng.choice(PEOPLE)} {verb} {first} and {second} {rng.choice(DURATIONS)} {detail} {rng.choice(FILLERS)}"
+
+
+def reword(text, rng):
+    words = text.split()
+    roll = rng.random()
+    if roll < 0.3:
+        i = rng.randrange(len(words))
+        word = words[i]
+        if len(word) > 3:
+            j = rng.randrange(len(word) - 1)
+            words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    elif roll < 0.6:
+        words.insert(rng.randrange(len(words)), rng.choice(["a", "very", "also", "ji"]))
+    elif roll < 0.8:
+        text = text.replace(" and ", " & ")
+        return text + rng.choice(["?", "!!", " ."])
+    else:
+        del words[rng.randrange(len(words))]
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--thresholds", default="0.6,0.7,0.8,0.9")
+    parser.add_argument("--max-bucket", type=int, default=32)
+    parser.add_argument("--max-candidates", type=int, default=8)
+    parser.add_argument("--num-perm", type=int, default=32)
+    parser.add_argument("--bands", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    cache = SemanticCache(
+        num_perm=args.num_perm, bands=args.bands, max_entries=args.entries,
+        max_bucket=args.max_bucket, max_candidates=args.max_candidates,
+    )
+    questions = []
+    seen = set()
+    start = time.perf_counter()
+    while len(questions) < args.entries:
+        text = question(rng)
+        if text in seen:
+            continue
+        seen.add(text)
+        cache.put("en", text, str(len(questions)))
+        questions.append(text)
+    build = time.perf_counter() - start
+    print(f"entries: {len(cache):,}  build: {build:.1f} s ({build / len(cache) * 1e6:.0f} us/put)  "
+          f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB\n")
+
+    picks = [rng.randrange(len(questions)) for _ in range(args.queries)]
+    probes = [(str(i), reword(questions[i], rng)) for i in picks]
+
+    print(f"{'threshold':>9} {'recall':>8} {'wrong hit':>10} {'p50 us':>8} {'p99 us':>8}")
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        cache.threshold = threshold
+        latencies = []
+        recalled = wrong = 0
+        for expected, text in probes:
+            t0 = time.perf_counter()
+            reply = cache.get("en", text)
+            latencies.append((time.perf_counter() - t0) * 1e6)
+            if reply == expected:
+                recalled += 1
+            elif reply is not None:
+                wrong += 1
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{threshold:>9.2f} {recalled / len(probes):>8.1%} {wrong / len(probes):>10.1%} "
+              f"{statistics.median(latencies):>8.0f} {p99:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
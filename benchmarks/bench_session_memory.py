@@ -0,0 +1,87 @@
+"""Bytes per live session: the old dict/deque layout against Session records.
+
+Both layouts are filled with the same conversations and held in an LRU
+keyed by WhatsApp number, the way SessionStore holds them.  Message texts
+are shared between sessions, so the numbers are pure per-session overhead
+on top of the text itself.
+
+Usage: python benchmarks/bench_session_memory.py [--sessions 100000] [--turns 0 4 20]
+"""
+import argparse
+import os
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from history import ConversationHistory
+from session_store import Session, compact_key
+
+TEXTS = [
+    ("user", "मुझे दो दिन से बुखार है और सिर में दर्द है", 21),
+    ("assistant", "Drink plenty of fluids, rest, and take paracetamol for the fever. See a doctor if it lasts.", 300),
+]
+
+
+class OldHistory:
+    """The previous ConversationHistory layout: a deque of tuples and a lock per history."""
+
+    def __init__(self, max_turns=20):
+        self.turns = deque(maxlen=max_turns)
+        self.summary = ""
+        self.summary_tokens = 0
+        self._lock = threading.Lock()
+
+    def append(self, role, content, tokens):
+        with self._lock:
+            self.turns.append((role, content, tokens))
+
+
+def old_layout(count, turns):
+    entries = OrderedDict()
+    for i in range(count):
+        history = OldHistory()
+        for t in range(turns):
+            history.append(*TEXTS[t % 2])
+        state = {"lang": "hi", "msg_count": turns // 2, "last_seen": 1e9 + i, "history": history}
+        entries[f"whatsapp:+91{9000000000 + i}"] = (1e9 + i, state)
+    return entries
+
+
+def new_layout(count, turns):
+    entries = OrderedDict()
+    for i in range(count):
+        history = ConversationHistory()
+        for t in range(turns):
+            history.append(*TEXTS[t % 2])
+        entries[compact_key(f"whatsapp:+91{9000000000 + i}")] = Session(history, "hi", turns // 2, 1e9 + i)
+    return entries
+
+
+def bytes_per_session(build, count, turns):
+    tracemalloc.start()
+    entries = build(count, turns)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, nargs="+", default=[0, 4, 20])
+    args = parser.parse_args()
+
+    print(f"{args.sessions:,} sessions, bytes per session excluding message text\n")
+    print(f"{'turns':>5}  {'old':>8}  {'new':>8}  saved")
+    for turns in args.turns:
+        old = bytes_per_session(old_layout, args.sessions, turns)
+        new = bytes_per_session(new_layout, args.sessions, turns)
+        print(f"{turns:>5}  {old:>8,.0f}  {new:>8,.0f}  {1 - new / old:.0%}")
+
+
+if __name__ == "__main__":
+    main()
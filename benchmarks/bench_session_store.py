@@ -0,0 +1,70 @@
+"""Simulate a month of WhatsApp traffic against SessionStore.
+
+Usage: python benchmarks/bench_session_store.py [--users 1000000] [--max-entries 100000]
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from history import ConversationHistory
+from session_store import Session, SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--messages-per-user", type=int, default=3)
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    parser.add_argument("--ttl", type=float, default=300)
+    parser.add_argument("--seconds", type=float, default=30 * 24 * 3600, help="simulated wall-clock span")
+    args = parser.parse_args()
+
+    clock = FakeClock()
+    store = SessionStore(max_entries=args.max_entries, ttl=args.ttl, clock=clock)
+    rng = random.Random(42)
+    total = args.users * args.messages_per_user
+    step = args.seconds / total
+
+    start_rss = rss_mb()
+    start = time.perf_counter()
+    for i in range(total):
+        clock.now = i * step
+        # Mostly fresh numbers, with a share of users coming back mid-session.
+        if i % args.messages_per_user == 0:
+            user_id = f"whatsapp:+91{i // args.messages_per_user:010d}"
+        else:
+            user_id = f"whatsapp:+91{max(0, i // args.messages_per_user - rng.randint(0, 50)):010d}"
+        state = store.get(user_id)
+        if state is None:
+            state = Session(ConversationHistory(), "en")
+        state.msg_count += 1
+        state.history.append("assistant", "x" * 200, 50)
+        store.put(user_id, state)
+    elapsed = time.perf_counter() - start
+
+    print(f"operations:       {total:,} get+put")
+    print(f"throughput:       {total / elapsed:,.0f} req/s ({elapsed / total * 1e6:.2f} us/req)")
+    print(f"peak RSS growth:  {rss_mb() - start_rss:.1f} MB")
+    for key, value in store.stats().items():
+        print(f"{key + ':':<17} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""RAM held by idle sessions, and how long a cold session takes to resume.
+
+Fills SessionStore with conversations of --turns messages drawn from a pool
+of Hindi and English health questions and answers, measures the heap with
+every session hot, then lets the simulated clock pass --cold-after so they
+are compressed and measures again.  Finally it resumes sessions with get(),
+hot and cold, and reports the latency.
+
+Usage: python benchmarks/bench_session_tiers.py [--sessions 50000] [--turns 6] [--cold-after 60]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from history import ConversationHistory
+from session_store import Session, SessionStore
+
+QUESTIONS = [
+    "मुझे दो दिन से बुखार है और सिर में दर्द है",
+    "मेरे बच्चे को खांसी है, क्या करें?",
+    "I have had a sore throat since yesterday, what should I take?",
+    "My mother has high sugar and feels dizzy in the morning",
+    "पेट में दर्द और उल्टी हो रही है",
+    "Is it safe to take paracetamol twice a day for three days?",
+    "मला ताप आला आहे आणि अंग दुखत आहे",
+    "What should I eat when I have loose motions?",
+]
+ANSWERS = [
+    "Drink plenty of fluids, rest, and take paracetamol for the fever. If it lasts more than three days "
+    "or you notice a rash or confusion, please see a doctor.",
+    "गुनगुना पानी और शहद दें, बच्चे को आराम करने दें। अगर सांस लेने में तकलीफ हो या तेज बुखार हो "
+    "तो तुरंत डॉक्टर को दिखाएं।",
+    "Gargle with warm salt water, drink warm fluids and avoid cold drinks. See a doctor if you have "
+    "trouble swallowing or a high fever.",
+    "Check her blood sugar before breakfast, make sure she eats regular meals and takes her medicines on "
+    "time. If she faints or is confused, call 108.",
+    "ओआरएस का घोल थोड़ा-थोड़ा पीते रहें और हल्का खाना खाएं। खून की उल्टी हो तो तुरंत अस्पताल जाएं।",
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def heap_mb():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 1e6
+
+
+def user_id(i):
+    return f"whatsapp:+91{9000000000 + i}"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1e6
+    return f"p50 {pick(0.5):6.1f} us  p99 {pick(0.99):6.1f} us"
+
+
+def fill(args, rng):
+    clock = FakeClock()
+    store = SessionStore(max_entries=args.sessions + 1, ttl=300, cold_after=args.cold_after, clock=clock)
+    for i in range(args.sessions):
+        history = ConversationHistory()
+        for t in range(args.turns):
+            # Fresh str objects, as they would be when read off a webhook.
+            if t % 2 == 0:
+                history.append("user", "".join(rng.choice(QUESTIONS)), rng.randint(15, 40))
+            else:
+                history.append("assistant", "".join(rng.choice(ANSWERS)), rng.randint(40, 120))
+        store.put(user_id(i), Session(history, "hi", args.turns // 2))
+    return store, clock
+
+
+def cool(store, clock, cold_after):
+    clock.now += cold_after + 1
+    # Every call compresses up to cool_batch idle sessions; keep calling until all are cold.
+    while store.stats()["cold"] < len(store):
+        store.get("whatsapp:+910000000000")
+
+
+def resume(store, sample):
+    latencies = []
+    for i in sample:
+        started = time.perf_counter()
+        store.get(user_id(i))
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--cold-after", type=float, default=60)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    base = heap_mb()
+    store, clock = fill(args, random.Random(42))
+    hot = heap_mb() - base
+    cool(store, clock, args.cold_after)
+    cold = heap_mb() - base
+    tracemalloc.stop()
+    del store
+
+    # Timings on a second, identical store, without tracemalloc slowing every allocation.
+    rng = random.Random(42)
+    store, clock = fill(args, rng)
+    started = time.perf_counter()
+    cool(store, clock, args.cold_after)
+    cooling = time.perf_counter() - started
+    sample = rng.sample(range(args.sessions), min(args.sessions, 5000))
+    cold_latencies = resume(store, sample)
+    hot_latencies = resume(store, sample)
+
+    print(f"{args.sessions:,} sessions of {args.turns} messages")
+    print(f"hot:   {hot:7.1f} MB  ({hot * 1e6 / args.sessions:,.0f} bytes/session)")
+    print(f"cold:  {cold:7.1f} MB  ({cold * 1e6 / args.sessions:,.0f} bytes/session, {1 - cold / hot:.0%} less)")
+    print(f"compressing took {cooling * 1e6 / args.sessions:.1f} us/session\n")
+    print(f"resume cold  {percentiles(cold_latencies)}")
+    print(f"resume hot   {percentiles(hot_latencies)}")
+
+
+if __name__ == "__main__":
+    main()
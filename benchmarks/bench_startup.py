@@ -0,0 +1,77 @@
+"""Report cold-start import time of app.py, broken down per top-level module.
+
+Each run starts a fresh interpreter with -X importtime, so the numbers
+include everything a new worker pays before it can serve a request.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 15] [--first-use]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+FIRST_USE = (
+    "import time; t = time.perf_counter(); import app; t1 = time.perf_counter(); "
+    "app.get_openai_client(); app.get_twilio_client(); t2 = time.perf_counter(); "
+    "print(f'FIRST_USE {(t1 - t) * 1e3:.1f} {(t2 - t1) * 1e3:.1f}')"
+)
+
+
+def import_breakdown():
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        # Shallow indent: imported directly by app.py or by the interpreter's own startup.
+        if match and len(match.group(3)) <= 3:
+            modules[match.group(4)] = int(match.group(2))
+    return modules
+
+
+def first_use_timing():
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_USE], cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("FIRST_USE"):
+            return tuple(float(x) for x in line.split()[1:])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--first-use", action="store_true", help="also time the first lazy client construction")
+    args = parser.parse_args()
+
+    samples = defaultdict(list)
+    first_use = []
+    for _ in range(args.runs):
+        for name, us in import_breakdown().items():
+            samples[name].append(us)
+        if args.first_use:
+            first_use.append(first_use_timing())
+
+    total = statistics.median(samples.pop("app", [0])) / 1000
+    print(f"import app (median of {args.runs}): {total:.1f} ms\n")
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    ranked = sorted(samples.items(), key=lambda item: -statistics.median(item[1]))
+    for name, values in ranked[:args.top]:
+        print(f"{name:<40} {statistics.median(values) / 1000:>14.1f}")
+    if first_use:
+        print(f"\nfirst get_openai_client() + get_twilio_client(): "
+              f"{statistics.median(f[1] for f in first_use):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    closed: calls go through; failure_threshold failures in a row open it.
+    open: calls fail at once with CircuitOpen for reset_timeout seconds.
+    half-open: a single trial call is let through; success closes the
+    circuit, failure opens it again.  is_failure decides which exceptions
+    count (client errors such as a bad request should not).  Safe to share
+    between threads and with asyncio code, since it never blocks.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, is_failure=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.changed_at = clock()
+        self._trial = False
+        self._lock = threading.Lock()
+        self.transitions = {self.OPEN: 0, self.HALF_OPEN: 0, self.CLOSED: 0}
+        self.rejected = 0
+
+    def _move(self, state):
+        self.state = state
+        self.changed_at = self.clock()
+        self.transitions[state] += 1
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self._move(self.HALF_OPEN)
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+            self.rejected += 1
+            raise CircuitOpen(f"circuit {self.state}, {self.failures} failures in a row")
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+            if self.state != self.CLOSED:
+                self._move(self.CLOSED)
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                self._move(self.OPEN)
+
+    @contextmanager
+    def guard(self):
+        """Wrap one call: rejects it while open and records how it went."""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.on_failure()
+            else:
+                self._release_trial()
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        self.on_success()
+
+    def _release_trial(self):
+        # The call ended without telling us anything (cancelled, cut by a deadline...).
+        with self._lock:
+            self._trial = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "failures_in_a_row": self.failures,
+            "seconds_in_state": round(self.clock() - self.changed_at, 1),
+            "transitions": dict(self.transitions),
+            "rejected": self.rejected,
+        }
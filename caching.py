@@ -0,0 +1,244 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger("health_assistant")
+
+
+def content_hash(fileobj, chunk_size=64 * 1024) -> str:
+    """sha256 of a seekable file's contents; the file is rewound afterwards."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def normalize_question(text: str) -> str:
+    """Case-fold, drop punctuation and symbols, and collapse whitespace.
+
+    Combining marks are kept, since Indic vowel signs change the word.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    kept = [ch if unicodedata.category(ch)[0] not in "PSC" else " " for ch in text]
+    return " ".join("".join(kept).split())
+
+
+class TranscriptCache:
+    """Whisper transcripts keyed by media content hash, with MediaSid aliases.
+
+    A MediaSid hit skips the download entirely; a content-hash hit skips the
+    Whisper call for forwarded or re-sent voice notes.  Entries live in an
+    LRU bounded by max_entries and, when disk_dir is set, in one small text
+    file per hash that survives restarts and is shared between workers.
+    A disk hit refreshes the file's mtime, and every purge_every writes the
+    files left unused for max_disk_age seconds are deleted, so the folder
+    stays about as large as the transcripts of that period.
+    """
+
+    def __init__(self, max_entries=10_000, disk_dir=None, max_disk_age=7 * 24 * 3600, purge_every=500,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_age = max_disk_age
+        self.purge_every = purge_every
+        self._clock = clock
+        self._writes = 0
+        self._by_hash = OrderedDict()
+        self._by_sid = OrderedDict()
+        self._lock = threading.Lock()
+        self.sid_hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_purged = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get_by_sid(self, media_sid):
+        if not media_sid:
+            return None
+        with self._lock:
+            digest = self._by_sid.get(media_sid)
+            transcript = self._by_hash.get(digest) if digest else None
+            if transcript is not None:
+                self._by_sid.move_to_end(media_sid)
+                self._by_hash.move_to_end(digest)
+                self.sid_hits += 1
+        return transcript
+
+    def get(self, digest, media_sid=None):
+        with self._lock:
+            transcript = self._by_hash.get(digest)
+            if transcript is not None:
+                self._by_hash.move_to_end(digest)
+                self.memory_hits += 1
+        if transcript is None:
+            transcript = self._read_disk(digest)
+            if transcript is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(digest, transcript, media_sid)
+        return transcript
+
+    def put(self, digest, transcript, media_sid=None):
+        self._remember(digest, transcript, media_sid)
+        self._write_disk(digest, transcript)
+
+    def _remember(self, digest, transcript, media_sid):
+        with self._lock:
+            self._by_hash[digest] = transcript
+            self._by_hash.move_to_end(digest)
+            if media_sid:
+                self._by_sid[media_sid] = digest
+                self._by_sid.move_to_end(media_sid)
+            while len(self._by_hash) > self.max_entries:
+                self._by_hash.popitem(last=False)
+            while len(self._by_sid) > self.max_entries:
+                self._by_sid.popitem(last=False)
+
+    def _disk_path(self, digest):
+        return os.path.join(self.disk_dir, digest[:2], f"{digest}.txt")
+
+    def _read_disk(self, digest):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(digest)
+        try:
+            with open(path, encoding="utf-8") as f:
+                transcript = f.read()
+            os.utime(path)  # still in use: keep it past the next purge
+            return transcript
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Transcript cache read failed: {e}")
+            return None
+
+    def _write_disk(self, digest, transcript):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(digest)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(transcript)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Transcript cache write failed: {e}")
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self._purge_disk()
+
+    def _purge_disk(self):
+        # Leftover .tmp files from a crashed write are old too, so they go the same way.
+        cutoff = self._clock() - self.max_disk_age
+        purged = 0
+        try:
+            for folder in os.scandir(self.disk_dir):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            purged += 1
+                    except FileNotFoundError:  # another worker got there first
+                        pass
+        except OSError as e:
+            logger.warning(f"Transcript cache purge failed: {e}")
+        self.disk_purged += purged
+
+    def stats(self):
+        hits = self.sid_hits + self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._by_hash),
+            "sid_hits": self.sid_hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "disk_purged": self.disk_purged,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """Answers to first-turn questions keyed on (lang, normalized text).
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the cache holds more than max_bytes of keys and replies.
+    """
+
+    ENTRY_OVERHEAD = 200  # rough per-entry cost of the dict slot, tuple and str headers
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=3600, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires, reply, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(lang, text):
+        return lang, normalize_question(text)
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._discard(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, reply):
+        size = len(key[0]) + len(key[1].encode("utf-8")) + len(reply.encode("utf-8")) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (self._clock() + self.ttl, reply, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
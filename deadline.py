@@ -0,0 +1,77 @@
+import time
+import random
+import asyncio
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget for answering one message, started when the webhook arrives.
+
+    Every outbound call takes its timeout from timeout(), so the calls made
+    for a message (including retries) finish or fail before the budget is
+    spent.
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """Seconds left (at most cap); raises DeadlineExceeded when nothing is left."""
+        left = self.remaining()
+        if left <= 0:
+            raise DeadlineExceeded("reply deadline exceeded")
+        return left if cap is None else min(left, cap)
+
+
+def retry_pause(attempt):
+    # Full-jitter exponential backoff: up to 1 s, 2 s, 4 s... before tries 2, 3, 4...
+    return random.uniform(0, 2 ** (attempt - 1))
+
+
+def retry(fn, errors, tries=3, deadline=None, default_timeout=None):
+    """Call fn(timeout) until it does not raise one of errors, at most tries times.
+
+    timeout is what is left of deadline, or default_timeout without one.  When
+    the deadline runs out, or the next pause would not fit in it, the last
+    error is re-raised as DeadlineExceeded.
+    """
+    for attempt in range(1, tries + 1):
+        timeout = deadline.timeout(default_timeout) if deadline else default_timeout
+        try:
+            return fn(timeout)
+        except errors as e:
+            pause = retry_pause(attempt)
+            if deadline and deadline.expired():
+                raise DeadlineExceeded("reply deadline exceeded") from e
+            if attempt == tries:
+                raise
+            if deadline and deadline.remaining() <= pause:
+                raise DeadlineExceeded("no time left to retry") from e
+            time.sleep(pause)
+
+
+async def retry_async(fn, errors, tries=3, deadline=None, default_timeout=None):
+    """retry() for a coroutine function fn."""
+    for attempt in range(1, tries + 1):
+        timeout = deadline.timeout(default_timeout) if deadline else default_timeout
+        try:
+            return await fn(timeout)
+        except errors as e:
+            pause = retry_pause(attempt)
+            if deadline and deadline.expired():
+                raise DeadlineExceeded("reply deadline exceeded") from e
+            if attempt == tries:
+                raise
+            if deadline and deadline.remaining() <= pause:
+                raise DeadlineExceeded("no time left to retry") from e
+            await asyncio.sleep(pause)
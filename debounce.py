@@ -0,0 +1,127 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("health_assistant")
+
+
+class Debouncer:
+    """Collects items per key and hands them over together once the key goes quiet.
+
+    flush_fn(key, items) is called `window` seconds after a key's latest item,
+    or `max_wait` after its first one if items keep coming, on one daemon
+    thread (restarted in a forked child, like JobQueue).  flush_fn should only
+    hand the work on, since every other key's flush waits behind it.
+    """
+
+    def __init__(self, flush_fn, window=1.5, max_wait=None, clock=time.monotonic):
+        self.flush_fn = flush_fn
+        self.window = window
+        self.max_wait = 3 * window if max_wait is None else max_wait
+        self.clock = clock
+        self._bursts = {}  # key -> [first_at, last_at, items]
+        self._due = []  # heap of (due, key); entries made stale by later items are skipped
+        self._cond = threading.Condition()
+        self._pid = None
+        self.bursts = 0
+        self.merged = 0
+
+    def _deadline(self, burst):
+        return min(burst[1] + self.window, burst[0] + self.max_wait)
+
+    def add(self, key, item):
+        if self._pid != os.getpid():
+            self.start()
+        with self._cond:
+            now = self.clock()
+            burst = self._bursts.get(key)
+            if burst is None:
+                burst = self._bursts[key] = [now, now, []]
+                self.bursts += 1
+            else:
+                burst[1] = now
+                self.merged += 1
+            burst[2].append(item)
+            heapq.heappush(self._due, (self._deadline(burst), key))
+            self._cond.notify()
+
+    def flush(self, key):
+        """Hand over key's pending items right away, if it has any."""
+        with self._cond:
+            burst = self._bursts.pop(key, None)
+        if burst is not None:
+            self.flush_fn(key, burst[2])
+
+    def start(self):
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="debounce", daemon=True).start()
+
+    def _next_ready(self):
+        with self._cond:
+            while True:
+                if not self._due:
+                    self._cond.wait()
+                    continue
+                due, key = self._due[0]
+                now = self.clock()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._due)
+                burst = self._bursts.get(key)
+                # Flushed early, or pushed back by a later item (which queued its own entry).
+                if burst is None or self._deadline(burst) > due:
+                    continue
+                del self._bursts[key]
+                return key, burst[2]
+
+    def _run(self):
+        while True:
+            key, items = self._next_ready()
+            try:
+                self.flush_fn(key, items)
+            except Exception as e:
+                logger.error(f"Flushing {len(items)} messages for {key} failed: {e}")
+
+    def stats(self):
+        return {"pending": len(self._bursts), "bursts": self.bursts, "merged": self.merged}
+
+
+class AsyncDebouncer:
+    """asyncio counterpart of Debouncer; flush_fn runs on the event loop and must not block."""
+
+    def __init__(self, flush_fn, window=1.5, max_wait=None):
+        self.flush_fn = flush_fn
+        self.window = window
+        self.max_wait = 3 * window if max_wait is None else max_wait
+        self._bursts = {}  # key -> [first_at, items, timer]
+        self.bursts = 0
+        self.merged = 0
+
+    def add(self, key, item):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = [now, [], None]
+            self.bursts += 1
+        else:
+            burst[2].cancel()
+            self.merged += 1
+        burst[1].append(item)
+        burst[2] = loop.call_later(min(self.window, burst[0] + self.max_wait - now), self.flush, key)
+
+    def flush(self, key):
+        burst = self._bursts.pop(key, None)
+        if burst is not None:
+            burst[2].cancel()
+            self.flush_fn(key, burst[1])
+
+    def stats(self):
+        return {"pending": len(self._bursts), "bursts": self.bursts, "merged": self.merged}
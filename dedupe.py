@@ -0,0 +1,173 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class DedupeCache:
+    """Remembers the reply computed for each Twilio MessageSid.
+
+    The first delivery of a MessageSid claims it and computes the reply;
+    retried deliveries get the stored reply, or wait for the in-flight one,
+    instead of calling Whisper and the chat model again.
+    """
+
+    poll_interval = 0.05
+
+    def claim(self, sid) -> bool:
+        """Return True if this caller should compute the reply for sid."""
+        raise NotImplementedError
+
+    def complete(self, sid, reply):
+        raise NotImplementedError
+
+    def release(self, sid):
+        raise NotImplementedError
+
+    def lookup(self, sid):
+        """Return (found, reply); reply is None while the sid is still in flight."""
+        raise NotImplementedError
+
+    def wait(self, sid, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            found, reply = self.lookup(sid)
+            if not found or reply is not None or time.monotonic() >= deadline:
+                return reply
+            time.sleep(self.poll_interval)
+
+    def run(self, sid, compute, timeout=10):
+        """Return (reply, duplicate). Duplicates that time out waiting get reply None."""
+        if not sid:
+            return compute(), False
+        if self.claim(sid):
+            try:
+                reply = compute()
+            except Exception:
+                self.release(sid)
+                raise
+            self.complete(sid, reply)
+            return reply, False
+        return self.wait(sid, timeout), True
+
+
+class MemoryDedupeCache(DedupeCache):
+    """Per-process cache, bounded by entry count (LRU) and TTL."""
+
+    def __init__(self, max_entries=10_000, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # sid -> [created, reply, event]
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def _expire(self, now):
+        while self._entries:
+            created = next(iter(self._entries.values()))[0]
+            if now - created <= self.ttl and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def claim(self, sid) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if sid in self._entries:
+                self.duplicates += 1
+                return False
+            self._entries[sid] = [now, None, threading.Event()]
+            return True
+
+    def complete(self, sid, reply):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return
+            entry[1] = reply
+        entry[2].set()
+
+    def release(self, sid):
+        with self._lock:
+            entry = self._entries.pop(sid, None)
+        if entry is not None:
+            entry[2].set()
+
+    def lookup(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+        return (False, None) if entry is None else (True, entry[1])
+
+    def wait(self, sid, timeout):
+        with self._lock:
+            entry = self._entries.get(sid)
+        if entry is None:
+            return None
+        entry[2].wait(timeout)
+        return entry[1]
+
+    def stats(self):
+        return {"backend": "memory", "size": len(self._entries), "duplicates": self.duplicates}
+
+
+class SqliteDedupeCache(DedupeCache):
+    """Cache shared by every worker process through a SQLite file in WAL mode."""
+
+    def __init__(self, path, ttl=600, purge_every=500):
+        self.path = path
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._claims = 0
+        self.duplicates = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS message_replies "
+                "(sid TEXT PRIMARY KEY, created REAL NOT NULL, reply TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS message_replies_created ON message_replies (created)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def claim(self, sid) -> bool:
+        conn = self._connect()
+        now = time.time()
+        self._claims += 1
+        if self._claims % self.purge_every == 0:
+            conn.execute("DELETE FROM message_replies WHERE created < ?", (now - self.ttl,))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO message_replies (sid, created, reply) VALUES (?, ?, NULL)", (sid, now)
+        )
+        if cursor.rowcount == 1:
+            return True
+        # A stale row left behind by an expired entry can be taken over.
+        cursor = conn.execute(
+            "UPDATE message_replies SET created = ?, reply = NULL WHERE sid = ? AND created < ?",
+            (now, sid, now - self.ttl),
+        )
+        if cursor.rowcount == 1:
+            return True
+        self.duplicates += 1
+        return False
+
+    def complete(self, sid, reply):
+        self._connect().execute("UPDATE message_replies SET reply = ? WHERE sid = ?", (reply, sid))
+
+    def release(self, sid):
+        self._connect().execute("DELETE FROM message_replies WHERE sid = ? AND reply IS NULL", (sid,))
+
+    def lookup(self, sid):
+        row = self._connect().execute("SELECT reply FROM message_replies WHERE sid = ?", (sid,)).fetchone()
+        return (False, None) if row is None else (True, row[0])
+
+    def stats(self):
+        (size,) = self._connect().execute("SELECT COUNT(*) FROM message_replies").fetchone()
+        return {"backend": "sqlite", "size": size, "duplicates": self.duplicates}
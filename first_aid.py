@@ -0,0 +1,81 @@
+from keywords import KeywordMatcher
+
+# Pre-written first-aid advice, used when OpenAI cannot be reached.
+SYMPTOM_WORDS = {
+    "fever": ["fever", "temperature", "bukhar", "bukhaar", "बुखार", "ज्वर", "ताप", "জ্বর"],
+    "cough": [
+        "cough", "cold", "runny nose", "sore throat", "khansi", "khasi", "jukam", "zukam",
+        "खांसी", "खाँसी", "जुकाम", "सर्दी", "खोकला", "কাশি", "সর্দি",
+    ],
+    "headache": [
+        "headache", "head ache", "sir dard", "sar dard", "सिरदर्द", "सिर दर्द", "सर दर्द",
+        "डोकेदुखी", "डोके दुखत", "মাথাব্যথা", "মাথা ব্যথা",
+    ],
+    "diarrhea": [
+        "diarrhea", "diarrhoea", "loose motion", "loose motions", "dast", "दस्त", "जुलाब",
+        "पातळ संडास", "ডায়রিয়া", "পাতলা পায়খানা",
+    ],
+    "vomiting": ["vomit", "vomiting", "throwing up", "ulti", "उल्टी", "उलटी", "उलट्या", "বমি"],
+    "stomach_pain": [
+        "stomach pain", "stomach ache", "abdominal pain", "tummy pain", "pet dard", "pet me dard",
+        "पेट दर्द", "पेट में दर्द", "पोटदुखी", "पोट दुखत", "পেটব্যথা", "পেট ব্যথা",
+    ],
+}
+
+INTRO = {
+    "hi": "मैं अभी अपनी सहायक सेवा से नहीं जुड़ पा रहा हूँ, इसलिए यह बुनियादी प्राथमिक उपचार सलाह है:",
+    "en": "I can't reach my assistant service right now, so here is basic first-aid advice:",
+    "mr": "मी आत्ता माझ्या सहाय्यक सेवेशी जोडू शकत नाही, म्हणून ही मूलभूत प्रथमोपचार माहिती आहे:",
+    "bn": "আমি এখন আমার সহায়ক পরিষেবার সঙ্গে যোগাযোগ করতে পারছি না, তাই এখানে প্রাথমিক চিকিৎসার সাধারণ পরামর্শ দেওয়া হলো:"
+}
+
+ADVICE = {
+    "fever": {
+        "hi": "🌡️ बुखार: आराम करें और खूब पानी, ओआरएस या सूप पिएं। पैरासिटामोल से बुखार कम हो सकता है; पैक पर लिखी खुराक ही लें। अगर बुखार 3 दिन से ज़्यादा रहे, 103°F से ऊपर जाए, या गर्दन में अकड़न, दाने, भ्रम या साँस लेने में तकलीफ हो तो डॉक्टर को दिखाएँ। 3 महीने से छोटे बच्चे को तुरंत डॉक्टर के पास ले जाएँ।",
+        "en": "🌡️ Fever: rest and drink plenty of water, ORS or soup. Paracetamol can bring the temperature down; follow the dose on the pack. See a doctor if the fever lasts more than 3 days, goes above 103°F, or comes with a stiff neck, rash, confusion or breathing trouble. Take babies under 3 months to a doctor right away.",
+        "mr": "🌡️ ताप: विश्रांती घ्या आणि भरपूर पाणी, ओआरएस किंवा सूप प्या. पॅरासिटामॉलने ताप कमी होऊ शकतो; पाकिटावर दिलेलाच डोस घ्या. ताप 3 दिवसांपेक्षा जास्त राहिला, 103°F च्या वर गेला, किंवा मान ताठ होणे, पुरळ, गोंधळ किंवा श्वास घेण्यास त्रास असेल तर डॉक्टरांना दाखवा. 3 महिन्यांपेक्षा लहान बाळाला लगेच डॉक्टरांकडे न्या.",
+        "bn": "🌡️ জ্বর: বিশ্রাম নিন এবং প্রচুর জল, ওআরএস বা স্যুপ খান। প্যারাসিটামল জ্বর কমাতে পারে; প্যাকেটে লেখা মাত্রাই নিন। জ্বর ৩ দিনের বেশি থাকলে, 103°F ছাড়ালে, অথবা ঘাড় শক্ত হওয়া, ফুসকুড়ি, বিভ্রান্তি বা শ্বাসকষ্ট হলে ডাক্তার দেখান। ৩ মাসের কম বয়সী শিশুকে সঙ্গে সঙ্গে ডাক্তারের কাছে নিয়ে যান।"
+    },
+    "cough": {
+        "hi": "🤧 खाँसी या जुकाम: आराम करें, गुनगुना पानी पिएं, भाप लें या गुनगुने नमक वाले पानी से गरारे करें। शहद खाँसी में मदद करता है (1 साल से छोटे बच्चों को न दें)। अगर 2 हफ्ते से ज़्यादा रहे, या तेज़ बुखार, सीने में दर्द, खाँसी में खून या साँस लेने में तकलीफ हो तो डॉक्टर को दिखाएँ।",
+        "en": "🤧 Cough or cold: rest, drink warm fluids, and try steam inhalation or warm salt-water gargles. Honey helps a cough (not for children under 1 year). See a doctor if it lasts more than 2 weeks, or if there is high fever, chest pain, blood in the cough or difficulty breathing.",
+        "mr": "🤧 खोकला किंवा सर्दी: विश्रांती घ्या, कोमट पाणी प्या, वाफ घ्या किंवा कोमट मिठाच्या पाण्याने गुळण्या करा. मध खोकल्यावर उपयोगी आहे (1 वर्षाखालील बाळांना देऊ नका). 2 आठवड्यांपेक्षा जास्त राहिल्यास, किंवा जास्त ताप, छातीत दुखणे, खोकल्यात रक्त किंवा श्वास घेण्यास त्रास असल्यास डॉक्टरांना दाखवा.",
+        "bn": "🤧 কাশি বা সর্দি: বিশ্রাম নিন, গরম পানীয় খান, ভাপ নিন বা হালকা গরম নুন-জলে গার্গল করুন। মধু কাশিতে উপকারী (১ বছরের কম বয়সী শিশুকে দেবেন না)। ২ সপ্তাহের বেশি থাকলে, অথবা বেশি জ্বর, বুকে ব্যথা, কাশির সঙ্গে রক্ত বা শ্বাসকষ্ট হলে ডাক্তার দেখান।"
+    },
+    "headache": {
+        "hi": "🤕 सिरदर्द: शांत, अँधेरे कमरे में आराम करें, पानी पिएं और खाना न छोड़ें। पैरासिटामोल से आराम मिल सकता है; पैक पर लिखी खुराक ही लें। अचानक बहुत तेज़ सिरदर्द हो, या साथ में बुखार और गर्दन में अकड़न, कमज़ोरी, भ्रम, देखने में दिक्कत हो, या सिर में चोट के बाद दर्द हो तो तुरंत मदद लें।",
+        "en": "🤕 Headache: rest in a quiet, dark room, drink water and don't skip meals. Paracetamol can help; follow the dose on the pack. Get help at once for a sudden, very severe headache, or one with fever and a stiff neck, weakness, confusion, vision problems, or after a head injury.",
+        "mr": "🤕 डोकेदुखी: शांत, अंधाऱ्या खोलीत विश्रांती घ्या, पाणी प्या आणि जेवण टाळू नका. पॅरासिटामॉलने आराम मिळू शकतो; पाकिटावर दिलेलाच डोस घ्या. अचानक खूप तीव्र डोकेदुखी, किंवा सोबत ताप आणि मान ताठ होणे, अशक्तपणा, गोंधळ, दिसण्यात अडचण असेल किंवा डोक्याला मार लागल्यानंतर दुखत असेल तर लगेच मदत घ्या.",
+        "bn": "🤕 মাথাব্যথা: শান্ত, অন্ধকার ঘরে বিশ্রাম নিন, জল খান এবং খাবার বাদ দেবেন না। প্যারাসিটামল আরাম দিতে পারে; প্যাকেটে লেখা মাত্রাই নিন। হঠাৎ খুব তীব্র মাথাব্যথা, অথবা সঙ্গে জ্বর ও ঘাড় শক্ত হওয়া, দুর্বলতা, বিভ্রান্তি, দেখতে সমস্যা হলে বা মাথায় আঘাতের পরে ব্যথা হলে সঙ্গে সঙ্গে সাহায্য নিন।"
+    },
+    "diarrhea": {
+        "hi": "💧 दस्त: थोड़ा-थोड़ा करके बार-बार ओआरएस पिएं (या 1 लीटर साफ़ पानी में 6 समतल चम्मच चीनी और आधा चम्मच नमक) और हल्का खाना खाते रहें। बच्चों को स्वास्थ्य कर्मी की सलाह से ज़िंक भी दें। मल में खून, तेज़ बुखार, 8 घंटे तक पेशाब न आना, बहुत कमज़ोरी हो या 2 दिन से ज़्यादा रहे तो डॉक्टर को दिखाएँ।",
+        "en": "💧 Loose motions: drink ORS often in small sips (or 6 level teaspoons of sugar and ½ teaspoon of salt in 1 litre of clean water) and keep eating light food. Children should also get zinc as advised by a health worker. See a doctor if there is blood in the stool, high fever, no urine for 8 hours, great weakness, or it lasts more than 2 days.",
+        "mr": "💧 जुलाब: थोडे-थोडे करून वारंवार ओआरएस प्या (किंवा 1 लिटर स्वच्छ पाण्यात 6 सपाट चमचे साखर आणि अर्धा चमचा मीठ) आणि हलके जेवण घेत राहा. मुलांना आरोग्य कर्मचाऱ्याच्या सल्ल्याने झिंकही द्या. संडासमध्ये रक्त, जास्त ताप, 8 तास लघवी न होणे, खूप अशक्तपणा असेल किंवा 2 दिवसांपेक्षा जास्त राहिल्यास डॉक्टरांना दाखवा.",
+        "bn": "💧 পাতলা পায়খানা: অল্প অল্প করে বারবার ওআরএস খান (অথবা ১ লিটার পরিষ্কার জলে ৬ সমান চা-চামচ চিনি ও আধ চা-চামচ নুন) এবং হালকা খাবার খেতে থাকুন। শিশুদের স্বাস্থ্যকর্মীর পরামর্শে জিঙ্কও দিন। পায়খানায় রক্ত, বেশি জ্বর, ৮ ঘণ্টা প্রস্রাব না হওয়া, খুব দুর্বলতা হলে বা ২ দিনের বেশি থাকলে ডাক্তার দেখান।"
+    },
+    "vomiting": {
+        "hi": "🤢 उल्टी: थोड़ी देर रुकें, फिर हर कुछ मिनट में थोड़ा-थोड़ा ओआरएस या पानी घूँट-घूँट पिएं; उल्टी रुकने पर हल्का खाना खाएँ। 6 घंटे तक कुछ भी पिया हुआ न टिके, उल्टी में खून या हरा पित्त हो, पेट में तेज़ दर्द हो, या पानी की कमी के लक्षण (मुँह बहुत सूखना, पेशाब कम या बिल्कुल न आना, सुस्ती) हों तो डॉक्टर को दिखाएँ।",
+        "en": "🤢 Vomiting: wait a little, then sip ORS or water in small amounts every few minutes; eat light food once it stops. See a doctor if no fluid stays down for 6 hours, there is blood or green bile, severe stomach pain, or signs of dehydration (very dry mouth, little or no urine, drowsiness).",
+        "mr": "🤢 उलट्या: थोडा वेळ थांबा, मग दर काही मिनिटांनी थोडे-थोडे ओआरएस किंवा पाणी घोट-घोट प्या; उलट्या थांबल्यावर हलके जेवण घ्या. 6 तास काहीच पोटात टिकत नसेल, उलटीत रक्त किंवा हिरवे पित्त असेल, पोटात तीव्र दुखत असेल, किंवा पाणी कमी झाल्याची लक्षणे (तोंड खूप कोरडे, लघवी कमी किंवा अजिबात नाही, गुंगी) असतील तर डॉक्टरांना दाखवा.",
+        "bn": "🤢 বমি: একটু অপেক্ষা করুন, তারপর কয়েক মিনিট পরপর অল্প অল্প করে ওআরএস বা জল চুমুক দিয়ে খান; বমি থামলে হালকা খাবার খান। ৬ ঘণ্টা কিছুই পেটে না থাকলে, বমিতে রক্ত বা সবুজ পিত্ত থাকলে, পেটে তীব্র ব্যথা হলে, অথবা জলশূন্যতার লক্ষণ (মুখ খুব শুকনো, প্রস্রাব কম বা একেবারে না হওয়া, ঝিমুনি) দেখা দিলে ডাক্তার দেখান।"
+    },
+    "stomach_pain": {
+        "hi": "🩺 पेट दर्द: आराम करें, घूँट-घूँट पानी पिएं और हल्का, सादा खाना खाएँ; तीखा-तला खाना, शराब और आइबुप्रोफेन जैसी दर्द की गोलियाँ न लें। दर्द बहुत तेज़ हो या बढ़ता जाए, दाईं ओर नीचे हो, या साथ में बुखार, बार-बार उल्टी, मल या उल्टी में खून, या पेट सख्त और फूला हुआ हो तो डॉक्टर को दिखाएँ। गर्भवती हों तो अभी डॉक्टर को दिखाएँ।",
+        "en": "🩺 Stomach pain: rest, sip water and eat light, plain food; avoid spicy or oily food, alcohol and painkillers like ibuprofen. See a doctor if the pain is severe or getting worse, sits low on the right side, or comes with fever, repeated vomiting, blood in stool or vomit, or a hard, swollen belly. If pregnant, see a doctor now.",
+        "mr": "🩺 पोटदुखी: विश्रांती घ्या, घोट-घोट पाणी प्या आणि हलके, साधे जेवण घ्या; तिखट-तेलकट पदार्थ, दारू आणि आयबुप्रोफेनसारख्या वेदनाशामक गोळ्या टाळा. दुखणे खूप तीव्र असेल किंवा वाढत असेल, उजव्या बाजूला खाली असेल, किंवा सोबत ताप, वारंवार उलट्या, संडास किंवा उलटीत रक्त, किंवा पोट कडक आणि फुगलेले असेल तर डॉक्टरांना दाखवा. गर्भवती असाल तर आत्ताच डॉक्टरांना दाखवा.",
+        "bn": "🩺 পেটব্যথা: বিশ্রাম নিন, চুমুক দিয়ে জল খান এবং হালকা, সাদামাটা খাবার খান; ঝাল-তেলেভাজা খাবার, মদ এবং আইবুপ্রোফেনের মতো ব্যথার ওষুধ এড়িয়ে চলুন। ব্যথা খুব তীব্র হলে বা বাড়তে থাকলে, ডান দিকে নিচে হলে, অথবা সঙ্গে জ্বর, বারবার বমি, পায়খানা বা বমিতে রক্ত, বা পেট শক্ত ও ফোলা থাকলে ডাক্তার দেখান। গর্ভবতী হলে এখনই ডাক্তার দেখান।"
+    },
+}
+
+SYMPTOMS = KeywordMatcher(SYMPTOM_WORDS)
+
+
+def first_aid_answer(text, lang, max_topics=2):
+    """Advice for the first max_topics symptoms named in text, or None if none are."""
+    hits = SYMPTOMS.scan(text)
+    topics = [symptom for symptom in ADVICE if symptom in hits][:max_topics]
+    if not topics:
+        return None
+    lang = lang if lang in INTRO else "en"
+    return "\n\n".join([INTRO[lang]] + [ADVICE[symptom][lang] for symptom in topics])
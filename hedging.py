@@ -0,0 +1,120 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class HedgePolicy:
+    """When to send a backup copy of a slow request, and how often that is allowed.
+
+    The backup goes out once a request has been running longer than the
+    `percentile` latency of the last `window` successful ones.  Every request
+    earns max_rate hedge tokens (up to burst) and every backup spends one, so
+    backups stay near max_rate of all requests.  Nothing is hedged until
+    min_samples latencies have been seen.
+    """
+
+    def __init__(self, percentile=0.9, max_rate=0.05, window=1000, min_samples=50, burst=10, refresh_every=50):
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.burst = burst
+        self.refresh_every = refresh_every
+        self._latencies = deque(maxlen=window)
+        self._since_refresh = 0
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+        self.delay = None
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def begin(self):
+        """Count a new request; returns the hedge delay in seconds, or None for no hedging yet."""
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.max_rate)
+            return self.delay
+
+    def allow_hedge(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    def record(self, latency, hedge_won=False):
+        with self._lock:
+            self._latencies.append(latency)
+            self.hedge_wins += hedge_won
+            self._since_refresh += 1
+            # Re-sorting the window on every request would cost more than it buys.
+            if len(self._latencies) >= self.min_samples and (
+                self.delay is None or self._since_refresh >= self.refresh_every
+            ):
+                ordered = sorted(self._latencies)
+                self.delay = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+                self._since_refresh = 0
+
+    def stats(self):
+        return {
+            "delay_ms": None if self.delay is None else round(self.delay * 1000, 1),
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def hedged_call(fn, policy, executor):
+    """Run fn() on executor, plus one backup copy if it is still running after the hedge delay.
+
+    The first copy to succeed wins.  A copy already running in a thread
+    cannot be stopped, so the slower one is abandoned and its result dropped.
+    """
+    delay = policy.begin()
+    started = time.monotonic()
+    first = executor.submit(fn)
+    pending = {first}
+    if delay is not None:
+        done, _ = wait(pending, timeout=delay)
+        if not done and policy.allow_hedge():
+            pending.add(executor.submit(fn))
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                policy.record(time.monotonic() - started, hedge_won=future is not first)
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+async def hedged_call_async(fn, policy):
+    """asyncio version of hedged_call for a coroutine function fn; the slower copy is cancelled."""
+    delay = policy.begin()
+    started = time.monotonic()
+    first = asyncio.ensure_future(fn())
+    pending = {first}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and policy.allow_hedge():
+                pending.add(asyncio.ensure_future(fn()))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.record(time.monotonic() - started, hedge_won=task is not first)
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,177 @@
+import os
+import time
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger("health_assistant")
+
+# Every chat message costs a few tokens of framing on top of its content.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# A turn's role is stored as its index here, in memory and when serialized.
+ROLES = ("user", "assistant")
+
+
+# A failed tokenizer load (usually the BPE download) is tried again after this many seconds.
+ENCODING_RETRY_AFTER = 60.0
+
+# model -> its encoding, or, while it loads or after a failed load, the
+# monotonic time from which loading may be tried again.
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _forget_pending_loads():
+    # A load running in the parent does not survive fork(); let the child start its own.
+    for model, encoding in list(_encodings.items()):
+        if isinstance(encoding, float):
+            del _encodings[model]
+
+
+os.register_at_fork(after_in_child=_forget_pending_loads)
+
+
+def _load_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:  # optional: fall back to a character-based estimate
+        encoding, retry_at = None, float("inf")
+    else:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:  # a model tiktoken does not know yet
+                encoding = tiktoken.get_encoding("o200k_base")
+            retry_at = None
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable, estimating token counts for now: {e}")
+            encoding, retry_at = None, time.monotonic() + ENCODING_RETRY_AFTER
+    with _encodings_lock:
+        _encodings[model] = encoding if encoding is not None else retry_at
+
+
+def get_encoding(model: str):
+    """The tokenizer for model, or None until it has loaded.
+
+    The first call starts loading it on a background thread, since tiktoken
+    may have to download its BPE file (cached on disk afterwards) and no
+    message should wait for that.  Meanwhile count_tokens estimates.
+    """
+    encoding = _encodings.get(model)
+    if encoding is not None and not isinstance(encoding, float):
+        return encoding
+    with _encodings_lock:
+        encoding = _encodings.get(model)
+        if encoding is None or (isinstance(encoding, float) and time.monotonic() >= encoding):
+            _encodings[model] = float("inf")  # loading
+            threading.Thread(target=_load_encoding, args=(model,), name="tokenizer", daemon=True).start()
+            return None
+    return None if isinstance(encoding, float) else encoding
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = get_encoding(model)
+    if encoding is None:
+        # Roughly 4 characters per token for English; Indic scripts run denser.
+        return MESSAGE_OVERHEAD_TOKENS + len(text) // 3 + 1
+    return MESSAGE_OVERHEAD_TOKENS + len(encoding.encode(text))
+
+
+class ConversationHistory:
+    """Bounded buffer of chat turns with cached per-turn token counts.
+
+    A live conversation is mostly overhead at this size, so turns are held
+    column-wise: role indexes in a bytearray, token counts in an array and
+    the texts in a list, under 20 bytes per turn on top of the text itself
+    (a (role, content, tokens) tuple alone costs 64).  There is no lock: a
+    history is only touched in its user's turn (app.user_locks), and the
+    summarizer takes its snapshot and folds in that turn too.
+    """
+
+    __slots__ = ("max_turns", "roles", "contents", "tokens", "summary", "summary_tokens")
+
+    def __init__(self, max_turns=20):
+        self.max_turns = max_turns
+        self.roles = bytearray()  # index into ROLES
+        self.contents = []
+        self.tokens = array("I")
+        self.summary = ""
+        self.summary_tokens = 0
+
+    def _turns(self):
+        return list(zip([ROLES[role] for role in self.roles], self.contents, self.tokens))
+
+    def _drop_oldest(self, count):
+        del self.roles[:count]
+        del self.contents[:count]
+        del self.tokens[:count]
+
+    def append(self, role: str, content: str, tokens: int):
+        self.roles.append(ROLES.index(role))
+        self.contents.append(content)
+        self.tokens.append(tokens)
+        if len(self.contents) > self.max_turns:
+            self._drop_oldest(len(self.contents) - self.max_turns)
+
+    def window(self, budget: int):
+        """Return the newest turns that fit in budget tokens, oldest first.
+
+        The newest turn is always included so the current message is never dropped.
+        """
+        selected = []
+        used = 0
+        for role, content, tokens in reversed(self._turns()):
+            if selected and used + tokens > budget:
+                break
+            selected.append({"role": role, "content": content})
+            used += tokens
+        selected.reverse()
+        return selected
+
+    def total_tokens(self) -> int:
+        return self.summary_tokens + sum(self.tokens)
+
+    def oldest_turns(self, keep: int):
+        """Return every turn except the newest keep as (role, content, tokens), for summarization."""
+        turns = self._turns()
+        return turns[:-keep] if keep else turns
+
+    def fold(self, turns, summary: str, summary_tokens: int):
+        """Replace turns (as returned by oldest_turns) with summary.
+
+        Turns appended since the snapshot are kept; turns the buffer has
+        already dropped are simply skipped.  Turns are matched by value, so a
+        history reloaded from a shared session store can be folded too.
+        """
+        current = self._turns()
+        if current:
+            for start in range(len(turns)):
+                # The buffer now starts somewhere inside the snapshot (or after it);
+                # only where the oldest turn reappears is worth comparing the rest.
+                if turns[start] != current[0]:
+                    continue
+                tail = turns[start:]
+                if current[:len(tail)] == tail:
+                    self._drop_oldest(len(tail))
+                    break
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+
+    def to_record(self):
+        """Compact, JSON-friendly form: [summary, summary_tokens, [[role, content, tokens], ...]]."""
+        turns = [list(turn) for turn in zip(self.roles, self.contents, self.tokens)]
+        return [self.summary, self.summary_tokens, turns]
+
+    @classmethod
+    def from_record(cls, record, max_turns=20):
+        history = cls(max_turns)
+        history.summary, history.summary_tokens, turns = record
+        for role, content, tokens in turns[-max_turns:]:
+            history.roles.append(role)
+            history.contents.append(content)
+            history.tokens.append(tokens)
+        return history
+
+    def __len__(self):
+        return len(self.contents)
@@ -0,0 +1,135 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("health_assistant")
+
+
+class LatencyWindow:
+    """Percentiles over the most recent `size` samples (seconds in, milliseconds out)."""
+
+    def __init__(self, size=1024):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def stats(self):
+        samples = sorted(self._samples.copy())
+        if not samples:
+            return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+        return {
+            "count": len(samples),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+            "p99_ms": round(samples[max(0, int(len(samples) * 0.99) - 1)] * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+
+
+class JobQueue:
+    """Bounded job queue served by a fixed pool of daemon worker threads.
+
+    submit() never blocks: when the queue is full the job is rejected and the
+    caller decides how to degrade.  Workers start on first submit and are
+    restarted in a forked child, since threads do not survive fork().
+
+    Jobs submitted with the same key run one after another in submission
+    order: while one is queued or running, later ones wait in that key's
+    mailbox and are run by the worker that finishes it, so they never tie up
+    a worker of their own.
+    """
+
+    def __init__(self, workers=4, max_pending=1000, name="jobs"):
+        self.workers = workers
+        self.name = name
+        self.max_pending = max_pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._mailboxes = {}  # key -> deque of jobs waiting for the key's current one
+        self._held = 0
+        self._keys_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.waits = LatencyWindow()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            # Keys busy in the parent have no worker here to release them.
+            self._mailboxes.clear()
+            self._held = 0
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, key=None) -> bool:
+        if self._pid != os.getpid():
+            self.start()
+        job = (fn, args, time.monotonic(), key)
+        with self._keys_lock:
+            if key is not None and key in self._mailboxes:
+                if self._queue.qsize() + self._held >= self.max_pending:
+                    self.rejected += 1
+                    return False
+                self._mailboxes[key].append(job)
+                self._held += 1
+            else:
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    self.rejected += 1
+                    return False
+                if key is not None:
+                    self._mailboxes[key] = deque()
+        self.submitted += 1
+        return True
+
+    def _next_for(self, key):
+        if key is None:
+            return None
+        with self._keys_lock:
+            mailbox = self._mailboxes.get(key)
+            if mailbox:
+                self._held -= 1
+                return mailbox.popleft()
+            self._mailboxes.pop(key, None)
+            return None
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                while job is not None:
+                    fn, args, enqueued_at, key = job
+                    self.waits.record(time.monotonic() - enqueued_at)
+                    try:
+                        fn(*args)
+                        self.completed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"Background job {getattr(fn, '__name__', fn)} failed: {e}")
+                    job = self._next_for(key)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        self._queue.join()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize(),
+            "held_in_order": self._held,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": self.waits.stats(),
+        }
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from deadline import DeadlineExceeded
+
+
+class KeyedLock:
+    """Mutual exclusion per key, granted in arrival order.
+
+    A key has an entry only while someone holds or waits for it, so the table
+    stays as small as the number of busy keys.  The table's own lock is held
+    just long enough to look up or hand over an entry, never while a caller
+    works, so callers with different keys never wait on each other.
+    """
+
+    def __init__(self):
+        self._waiters = {}  # key -> deque of Events, one per caller queued behind the holder
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.timeouts = 0
+
+    def acquire(self, key, timeout=None) -> bool:
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters is None:
+                self._waiters[key] = deque()
+                self.acquired += 1
+                return True
+            turn = threading.Event()
+            waiters.append(turn)
+            self.waited += 1
+        if not turn.wait(timeout):
+            with self._lock:
+                if not turn.is_set():
+                    waiters.remove(turn)
+                    self.timeouts += 1
+                    return False
+        # release() handed the lock straight to us.
+        self.acquired += 1
+        return True
+
+    def release(self, key):
+        with self._lock:
+            waiters = self._waiters[key]
+            if waiters:
+                waiters.popleft().set()
+            else:
+                del self._waiters[key]
+
+    @contextmanager
+    def hold(self, key, deadline=None):
+        """Hold key's lock for a block, waiting no longer than deadline allows."""
+        timeout = deadline.timeout() if deadline else None
+        if not self.acquire(key, timeout):
+            raise DeadlineExceeded(f"{key} still busy after {timeout:.1f}s")
+        try:
+            yield True
+        finally:
+            self.release(key)
+
+    @contextmanager
+    def hold_if_free(self, key):
+        """Hold key's lock for a block if nobody has it; yields whether it was taken."""
+        with self._lock:
+            taken = key not in self._waiters
+            if taken:
+                self._waiters[key] = deque()
+                self.acquired += 1
+        try:
+            yield taken
+        finally:
+            if taken:
+                self.release(key)
+
+    def stats(self):
+        return {"busy": len(self._waiters), "acquired": self.acquired, "waited": self.waited, "timeouts": self.timeouts}
+
+
+class AsyncKeyedLock:
+    """asyncio counterpart of KeyedLock, for use from a single event loop.
+
+    Bound the wait by cancelling the caller (e.g. with asyncio.wait_for).
+    """
+
+    def __init__(self):
+        self._waiters = {}  # key -> deque of futures
+        self.acquired = 0
+        self.waited = 0
+
+    async def acquire(self, key):
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            self._waiters[key] = deque()
+            self.acquired += 1
+            return
+        turn = asyncio.get_running_loop().create_future()
+        waiters.append(turn)
+        self.waited += 1
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if not turn.cancelled():
+                # Cancelled just after being handed the lock: pass it on.
+                self.release(key)
+            raise
+        self.acquired += 1
+
+    def release(self, key):
+        waiters = self._waiters[key]
+        while waiters:
+            turn = waiters.popleft()
+            if not turn.done():  # cancelled waiters are skipped
+                turn.set_result(None)
+                return
+        del self._waiters[key]
+
+    @asynccontextmanager
+    async def hold(self, key):
+        await self.acquire(key)
+        try:
+            yield True
+        finally:
+            self.release(key)
+
+    @asynccontextmanager
+    async def hold_if_free(self, key):
+        taken = key not in self._waiters
+        if taken:
+            self._waiters[key] = deque()
+            self.acquired += 1
+        try:
+            yield taken
+        finally:
+            if taken:
+                self.release(key)
+
+    def stats(self):
+        return {"busy": len(self._waiters), "acquired": self.acquired, "waited": self.waited}
@@ -0,0 +1,77 @@
+import unicodedata
+from collections import deque
+
+
+def _is_word_char(ch: str) -> bool:
+    # Combining marks (Devanagari/Bengali vowel signs, viramas) belong to the word they follow.
+    return ch.isalnum() or unicodedata.category(ch)[0] == "M"
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every keyword category.
+
+    Compiled once; scan() walks the message a single time and returns each
+    category with a hit.  A keyword must start a word, so "burn" is not found
+    in "heartburn" but is in "burns".  Categories listed in whole_word (all
+    of them by default) must also end the word, so "no" does not match
+    inside "know".
+    """
+
+    def __init__(self, categories, whole_word=None):
+        self.whole_word = set(categories) if whole_word is None else set(whole_word)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # state -> [(keyword length, category, keyword)]
+        for category, words in categories.items():
+            for word in words:
+                self._add(word.lower(), category)
+        self._build_failure_links()
+
+    def _add(self, word: str, category: str):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(word), category, word))
+
+    def _build_failure_links(self):
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in self._goto[state].items():
+                pending.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def scan(self, text: str):
+        """Return {category: [keywords]} for the matches, in order of appearance."""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = {}
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            after_ok = end == len(text) or not _is_word_char(text[end])
+            for length, category, word in out[state]:
+                if not after_ok and category in self.whole_word:
+                    continue
+                start = end - length
+                if start and _is_word_char(text[start - 1]):
+                    continue
+                found = hits.setdefault(category, [])
+                if word not in found:
+                    found.append(word)
+        return hits
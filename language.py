@@ -0,0 +1,107 @@
+import threading
+from collections import Counter, OrderedDict
+
+# Words that separate Hindi from Marathi when both are written in Devanagari.
+HINDI_MARKERS = {"है", "हैं", "नहीं", "क्या", "मुझे", "मेरे", "मेरा", "में", "और", "हो", "रहा", "रही", "कर", "को"}
+MARATHI_MARKERS = {"आहे", "आहेत", "नाही", "काय", "मला", "माझे", "माझा", "माझी", "आणि", "होत", "करा", "झाला", "झाली", "खूप"}
+
+
+def script_of(ch: str):
+    code = ord(ch)
+    if 0x0900 <= code <= 0x097F:
+        return "devanagari"
+    if 0x0980 <= code <= 0x09FF:
+        return "bengali"
+    if ch.isascii() or 0x00C0 <= code <= 0x024F:
+        return "latin" if ch.isalpha() else None
+    return "other" if ch.isalpha() else None
+
+
+def script_histogram(text: str) -> Counter:
+    return Counter(script for script in map(script_of, text) if script)
+
+
+class LanguageDetector:
+    """Classify a message from its Unicode script, falling back to langdetect.
+
+    Bengali and Latin script are answered straight from the script histogram.
+    Devanagari is split into Hindi and Marathi by marker words and only sent
+    to the (seeded, so deterministic) n-gram model when those are a tie.
+    The detected language is remembered per user in a bounded LRU, unless
+    the message gave nothing to go on ("123", an unsupported language) and
+    the default was only a guess.
+    """
+
+    def __init__(self, supported, default="en", cache_size=100_000, seed=0):
+        self.supported = set(supported)
+        self.default = default
+        self.cache_size = cache_size
+        self.seed = seed
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.fast_path = 0
+        self.ngram = 0
+
+    def detect(self, text: str, user_id=None) -> str:
+        if user_id is not None:
+            with self._lock:
+                lang = self._cache.get(user_id)
+                if lang is not None:
+                    self._cache.move_to_end(user_id)
+                    return lang
+        lang, known = self._classify(text)
+        if user_id is not None and known:
+            with self._lock:
+                self._cache[user_id] = lang
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return lang
+
+    def forget(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def _classify(self, text: str):
+        """Return (lang, known); known is False when lang is only the default."""
+        histogram = script_histogram(text)
+        if not histogram:
+            return self.default, False
+        script = histogram.most_common(1)[0][0]
+        if script == "bengali":
+            return self._fast("bn")
+        if script == "latin":
+            # English and romanized Hindi ("Hinglish") both get English replies.
+            return self._fast("en")
+        if script == "devanagari":
+            if "ळ" in text:  # LLA is common in Marathi and almost absent from Hindi
+                return self._fast("mr")
+            words = [word.strip("।॥.,!?") for word in text.split()]
+            hindi = sum(word in HINDI_MARKERS for word in words)
+            marathi = sum(word in MARATHI_MARKERS for word in words)
+            if hindi != marathi:
+                return self._fast("hi" if hindi > marathi else "mr")
+            return self._ngram(text, candidates=("hi", "mr"), default="hi")
+        return self._ngram(text)
+
+    def _fast(self, lang: str):
+        self.fast_path += 1
+        if lang in self.supported:
+            return lang, True
+        return self.default, False
+
+    def _ngram(self, text: str, candidates=None, default=None):
+        self.ngram += 1
+        from langdetect import DetectorFactory, detect_langs
+
+        DetectorFactory.seed = self.seed
+        try:
+            guesses = detect_langs(text)
+        except Exception:
+            guesses = []
+        for guess in guesses:
+            if guess.lang in self.supported and (candidates is None or guess.lang in candidates):
+                return guess.lang, True
+        return default or self.default, False
+
+    def stats(self):
+        return {"cached_users": len(self._cache), "fast_path": self.fast_path, "ngram": self.ngram}
@@ -0,0 +1,182 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def overload_hint(error):
+    """(overloaded, retry_after) for an exception raised by an upstream HTTP call.
+
+    429s, 5xx responses and timeouts count as overload; retry_after comes from
+    the response's Retry-After header when there is one.
+    """
+    status = getattr(error, "status_code", None) or 0
+    overloaded = status == 429 or status >= 500 or isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return overloaded, parse_retry_after(headers.get("retry-after"))
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls to an upstream API.
+
+    Each healthy call (no overload error, latency under latency_target) adds
+    1/limit to the limit, so it grows by about one per round of calls.  An
+    overloaded or slow call multiplies it by decrease_ratio, at most once per
+    decrease_interval so one burst of errors is one cut.  A Retry-After hint
+    closes the gate until it passes.  Callers wait at most max_wait for a slot
+    and get LimitExceeded otherwise, so they can degrade instead of piling on.
+    """
+
+    def __init__(self, initial=8, min_limit=1, max_limit=64, latency_target=10.0, decrease_ratio=0.5,
+                 decrease_interval=1.0, max_wait=1.0, clock=time.monotonic):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_ratio = decrease_ratio
+        self.decrease_interval = decrease_interval
+        self.max_wait = max_wait
+        self.clock = clock
+        self.in_flight = 0
+        self.closed_until = 0.0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+        self.overloads = 0
+        self.decreases = 0
+
+    def _admit(self, now, give_up):
+        """Take a slot and return None, or return how long to wait before trying again."""
+        if now >= self.closed_until and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+        if self.closed_until > give_up or now >= give_up:
+            self.rejected += 1
+            if now < self.closed_until:
+                raise LimitExceeded(f"upstream asked to wait {self.closed_until - now:.1f}s more")
+            raise LimitExceeded(f"{self.in_flight} calls in flight, limit {int(self.limit)}")
+        return (self.closed_until if now < self.closed_until else give_up) - now
+
+    def _finish(self, latency, overloaded, retry_after):
+        now = self.clock()
+        self.in_flight -= 1
+        if retry_after:
+            self.closed_until = max(self.closed_until, now + retry_after)
+        if overloaded:
+            self.overloads += 1
+        if overloaded or latency > self.latency_target:
+            if now - self._last_decrease >= self.decrease_interval:
+                self.limit = max(self.min_limit, self.limit * self.decrease_ratio)
+                self._last_decrease = now
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wait_budget(self, timeout):
+        return self.max_wait if timeout is None else min(timeout, self.max_wait)
+
+    def acquire(self, timeout=None):
+        """Wait for a slot (at most max_wait, or timeout if shorter); returns the start time."""
+        with self._cond:
+            start = self.clock()
+            give_up = start + self._wait_budget(timeout)
+            while True:
+                now = self.clock()
+                wait = self._admit(now, give_up)
+                if wait is None:
+                    return start
+                self._cond.wait(wait)
+
+    def release(self, started, overloaded=False, retry_after=None):
+        with self._cond:
+            self._finish(self.clock() - started, overloaded, retry_after)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold a slot for one call; yields what is left of timeout after waiting for it."""
+        started = self.acquire(timeout)
+        waited = self.clock() - started
+        overloaded, retry_after = False, None
+        try:
+            yield None if timeout is None else max(timeout - waited, 0.01)
+        except Exception as e:
+            overloaded, retry_after = overload_hint(e)
+            raise
+        finally:
+            self.release(started + waited, overloaded, retry_after)
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "closed_for": round(max(0.0, self.closed_until - self.clock()), 2),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+        }
+
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """asyncio counterpart of AdaptiveLimiter, for use from a single event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = set()
+
+    async def acquire(self, timeout=None):
+        start = self.clock()
+        give_up = start + self._wait_budget(timeout)
+        while True:
+            wait = self._admit(self.clock(), give_up)
+            if wait is None:
+                return start
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter, wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters.discard(waiter)
+
+    def release(self, started, overloaded=False, retry_after=None):
+        self._finish(self.clock() - started, overloaded, retry_after)
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        started = await self.acquire(timeout)
+        waited = self.clock() - started
+        overloaded, retry_after = False, None
+        try:
+            yield None if timeout is None else max(timeout - waited, 0.01)
+        except Exception as e:
+            overloaded, retry_after = overload_hint(e)
+            raise
+        finally:
+            self.release(started + waited, overloaded, retry_after)
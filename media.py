@@ -0,0 +1,85 @@
+import os
+import threading
+import tempfile
+
+AUDIO_EXTENSIONS = {
+    "audio/ogg": ".ogg",
+    "audio/opus": ".ogg",
+    "audio/mpeg": ".mp3",
+    "audio/mp4": ".m4a",
+    "audio/aac": ".m4a",
+    "audio/wav": ".wav",
+    "audio/webm": ".webm",
+}
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+class MediaFetcher:
+    """Streams Twilio media over a pooled keep-alive session into a spooled buffer.
+
+    Bodies up to spool_bytes stay in memory; larger ones roll over to an
+    anonymous temp file that is removed when the buffer is closed.
+    """
+
+    def __init__(self, auth=None, connect_timeout=3.05, read_timeout=15, max_bytes=16 * 1024 * 1024,
+                 spool_bytes=2 * 1024 * 1024, pool_size=16, chunk_size=64 * 1024):
+        self.auth = auth
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.pool_size = pool_size
+        self.chunk_size = chunk_size
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.auth = self.auth
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def fetch(self, url, max_bytes=None, timeout=None, deadline=None):
+        """Return (buffer, filename) with the buffer rewound; the caller closes it.
+
+        With a deadline, each socket wait is capped by the time left on it and
+        the download is abandoned (DeadlineExceeded) once it runs out.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        timeout = timeout or self.timeout
+        if deadline is not None:
+            timeout = tuple(deadline.timeout(t) for t in timeout)
+        with self._get_session().get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            declared = int(response.headers.get("Content-Length") or 0)
+            if declared > max_bytes:
+                raise MediaTooLarge(f"media is {declared} bytes, limit is {max_bytes}")
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+            size = 0
+            try:
+                for chunk in response.iter_content(self.chunk_size):
+                    if deadline is not None:
+                        deadline.timeout()
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise MediaTooLarge(f"media exceeds {max_bytes} bytes")
+                    buffer.write(chunk)
+            except BaseException:
+                buffer.close()
+                raise
+        buffer.seek(0)
+        return buffer, "audio" + AUDIO_EXTENSIONS.get(content_type, ".ogg")
@@ -0,0 +1,176 @@
+import re
+import zlib
+import random
+import operator
+import threading
+from array import array
+from collections import Counter, OrderedDict
+
+from caching import normalize_question
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_EMPTY = 1 << 32
+_DENSIFY_STEP = 0x9E3779B1
+
+# Words that flip a question's meaning while changing only a few shingles.
+NEGATIONS = frozenset({
+    "no", "not", "never", "none", "nothing", "without", "cannot", "nahi", "nahin",  # English, Hinglish
+    "नहीं", "नही", "न", "ना", "मत", "बिना",  # Hindi
+    "नाही", "नको", "नाहीत",  # Marathi
+    "না", "নয়", "নেই", "নি", "ছাড়া",  # Bengali
+})
+_CONTRACTED_NOT = re.compile(r"n['’]t\b", re.IGNORECASE)
+_AND_SYMBOLS = re.compile(r"[+&]")
+
+
+def canonical(text: str) -> str:
+    """normalize_question, after spelling out "n't" and the "+"/"&" that stand for "and"."""
+    text = _AND_SYMBOLS.sub(" and ", _CONTRACTED_NOT.sub(" not", text))
+    return normalize_question(text)
+
+
+def guard(text: str):
+    """The numbers and negation words of a question, in order.
+
+    Two questions can only share an answer when these are equal: "my 2 year
+    old" and "my 12 year old", or "fever" and "no fever", are close enough in
+    shingles to pass any useful threshold.
+    """
+    return tuple(token for token in canonical(text).split() if token.isdigit() or token in NEGATIONS)
+
+
+def shingles(text: str, size=3):
+    """Character shingles of the canonical text, hashed to 32-bit ints."""
+    text = f" {canonical(text)} "
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+class SemanticCache:
+    """Near-duplicate answer cache using MinHash signatures and LSH banding.
+
+    Each question is reduced to a one-permutation MinHash signature of its
+    character shingles.  Signatures are split into bands; questions sharing
+    any band bucket become candidates, and a candidate is a hit when the
+    fraction of equal signature slots (an estimate of Jaccard similarity)
+    reaches threshold and its numbers and negation words match exactly.  Buckets keep only their max_bucket newest entries,
+    so lookup cost is bounded regardless of the number of cached entries.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=32, bands=4, max_entries=100_000, max_bucket=32,
+                 max_candidates=8, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.max_bucket = max_bucket
+        self.max_candidates = max_candidates
+        rng = random.Random(seed)
+        self._mix = (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        self._entries = OrderedDict()  # entry id -> (lang, signature, guard, reply)
+        self._buckets = {}  # lang -> {band key: [entry ids]}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, text: str):
+        """One-permutation MinHash: each shingle is hashed once into one of num_perm bins.
+
+        Empty bins borrow the next filled bin to their right (rotation
+        densification), so short messages still get a full signature.
+        """
+        num_perm = self.num_perm
+        a, b = self._mix
+        bins = [_EMPTY] * num_perm
+        for h in shingles(text):
+            value = (a * h + b) % _MERSENNE_PRIME
+            slot = value % num_perm
+            value = (value // num_perm) & _MAX_HASH
+            if value < bins[slot]:
+                bins[slot] = value
+        filled = bins[:]
+        for slot in range(num_perm):
+            if filled[slot] == _EMPTY:
+                for offset in range(1, num_perm):
+                    value = filled[(slot + offset) % num_perm]
+                    if value != _EMPTY:
+                        bins[slot] = (value + offset * _DENSIFY_STEP) & _MAX_HASH
+                        break
+        return array("I", bins)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((band, *signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def get(self, lang, text):
+        signature = self.signature(text)
+        required = guard(text)
+        best_id, best_score = None, self.threshold
+        with self._lock:
+            buckets = self._buckets.get(lang)
+            if buckets:
+                # Entries sharing more bands are more similar, so only the top few are verified.
+                shared = Counter()
+                for key in self._band_keys(signature):
+                    shared.update(buckets.get(key, ()))
+                for entry_id, _ in shared.most_common(self.max_candidates):
+                    _, other, other_guard, _ = self._entries[entry_id]
+                    if other_guard != required:
+                        continue
+                    score = sum(map(operator.eq, signature, other)) / self.num_perm
+                    if score >= best_score:
+                        best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][3]
+
+    def put(self, lang, text, reply):
+        signature = self.signature(text)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (lang, signature, guard(text), reply)
+            buckets = self._buckets.setdefault(lang, {})
+            for key in self._band_keys(signature):
+                bucket = buckets.setdefault(key, [])
+                bucket.append(entry_id)
+                if len(bucket) > self.max_bucket:
+                    # Very common phrasings would otherwise make every lookup scan a long list.
+                    del bucket[0]
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (lang, signature, _, _) = self._entries.popitem(last=False)
+        buckets = self._buckets[lang]
+        for key in self._band_keys(signature):
+            bucket = buckets.get(key)
+            if bucket is None or entry_id not in bucket:
+                continue
+            bucket.remove(entry_id)
+            if not bucket:
+                del buckets[key]
+        self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
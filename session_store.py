@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from history import ConversationHistory
+
+
+class Session:
+    """One user's conversation: language, message count, last activity and history.
+
+    Slotted, since hundreds of thousands are live at once.  lang stays a
+    str: the few language codes are shared constants, so the slot costs the
+    same 8 bytes as a small int would.
+    """
+
+    __slots__ = ("lang", "msg_count", "last_seen", "history")
+
+    def __init__(self, history, lang=None, msg_count=0, last_seen=0.0):
+        self.lang = lang
+        self.msg_count = msg_count
+        self.last_seen = last_seen
+        self.history = history
+
+
+def compact_key(user_id):
+    """Key a WhatsApp number by its digits as an int: 32 bytes instead of a 71-byte str."""
+    digits = user_id[10:] if user_id.startswith("whatsapp:+") else ""
+    return int(digits) if digits.isascii() and digits.isdigit() else user_id
+
+
+class SessionBackend:
+    """Where user sessions live between messages.
+
+    A message reads its session once with get() and writes it back once with
+    put(), so a backend shared between worker processes costs two round trips
+    per message.  update() applies a change to the stored session in place,
+    for background work such as summaries that finishes after the message.
+    """
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def put(self, user_id, state):
+        raise NotImplementedError
+
+    def pop(self, user_id, default=None):
+        raise NotImplementedError
+
+    def update(self, user_id, change):
+        """Call change(state) on the stored session, if there still is one."""
+        raise NotImplementedError
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id):
+        state = self.get(user_id)
+        if state is None:
+            raise KeyError(user_id)
+        return state
+
+    def __setitem__(self, user_id, state):
+        self.put(user_id, state)
+
+
+class SessionStore(SessionBackend):
+    """Bounded LRU session store with TTL expiry.
+
+    Every session shares the same TTL and is moved to the back of the LRU
+    order whenever it is touched, so recency order is also expiry order:
+    the oldest entry is always at the front and expired entries are
+    reclaimed by popping from the front.  Each call does O(1) amortized work.
+    States are Session records; the store keeps their last_seen current and
+    keys WhatsApp numbers as ints (see compact_key).
+
+    With cold_after set, sessions idle that long leave the hot LRU and are
+    kept as one zlib-compressed encode_state() blob each, still in recency
+    order; the next get() decompresses them again.  The live Session object
+    is never changed, so a message still holding it is unaffected.  Each
+    call compresses at most cool_batch sessions, so the first message after
+    a quiet spell does not pay for everyone who went idle in between.
+    """
+
+    cool_batch = 64
+
+    def __init__(self, max_entries=100_000, ttl=300, cold_after=None, max_turns=20, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cold_after = cold_after
+        self.max_turns = max_turns
+        self._clock = clock
+        self._entries = OrderedDict()  # compact_key(user_id) -> state
+        self._cold = OrderedDict()  # compact_key(user_id) -> (last_seen, compressed state)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.compressions = 0
+        self.rehydrations = 0
+
+    def get(self, user_id):
+        now = self._clock()
+        key = compact_key(user_id)
+        with self._lock:
+            self._expire(now)
+            state = self._entries.get(key)
+            if state is None:
+                cold = self._cold.pop(key, None)
+                if cold is None:
+                    self.misses += 1
+                    return None
+                state = self._entries[key] = self._thaw(cold)
+            self.hits += 1
+            state.last_seen = now
+            self._entries.move_to_end(key)
+            return state
+
+    def put(self, user_id, state):
+        now = self._clock()
+        key = compact_key(user_id)
+        with self._lock:
+            self._expire(now)
+            self._cold.pop(key, None)
+            state.last_seen = now
+            self._entries[key] = state
+            self._entries.move_to_end(key)
+            while len(self._entries) + len(self._cold) > self.max_entries:
+                (self._cold or self._entries).popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, user_id, default=None):
+        key = compact_key(user_id)
+        with self._lock:
+            state = self._entries.pop(key, None)
+            cold = self._cold.pop(key, None)
+            if state is None and cold is not None:
+                state = self._thaw(cold)
+        return default if state is None else state
+
+    def update(self, user_id, change):
+        key = compact_key(user_id)
+        with self._lock:
+            state = self._entries.get(key)
+            if state is None:
+                cold = self._cold.get(key)
+                if cold is not None:
+                    # Stays cold: assigning an existing key keeps its place in line.
+                    state = self._thaw(cold)
+                    change(state)
+                    self._cold[key] = self._freeze(state)
+                return
+        # Sessions are live objects here, so there is nothing to write back.
+        change(state)
+
+    def __len__(self):
+        return len(self._entries) + len(self._cold)
+
+    def _freeze(self, state):
+        self.compressions += 1
+        return state.last_seen, zlib.compress(encode_state(state))
+
+    def _thaw(self, cold):
+        self.rehydrations += 1
+        last_seen, data = cold
+        return decode_state(zlib.decompress(data), last_seen, self.max_turns)
+
+    def _expire(self, now):
+        deadline = now - self.ttl
+        # Every cold session is older than every hot one.
+        cold = self._cold
+        while cold and next(iter(cold.values()))[0] < deadline:
+            cold.popitem(last=False)
+            self.expirations += 1
+        entries = self._entries
+        while entries:
+            if next(iter(entries.values())).last_seen >= deadline:
+                break
+            entries.popitem(last=False)
+            self.expirations += 1
+        if self.cold_after is not None:
+            idle = now - self.cold_after
+            for _ in range(self.cool_batch):
+                if not entries or next(iter(entries.values())).last_seen >= idle:
+                    break
+                key, state = entries.popitem(last=False)
+                cold[key] = self._freeze(state)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries) + len(self._cold)
+            return {
+                "backend": "memory",
+                "size": size,
+                "max_entries": self.max_entries,
+                "occupancy": size / self.max_entries if self.max_entries else 0.0,
+                "cold": len(self._cold),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "compressions": self.compressions,
+                "rehydrations": self.rehydrations,
+            }
+
+
+def encode_state(state) -> bytes:
+    """Serialize a session as compact UTF-8 JSON (Indic text stays 3 bytes a character)."""
+    record = [state.lang, state.msg_count, state.history.to_record()]
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_state(data, last_seen, max_turns=20):
+    lang, msg_count, history = json.loads(data)
+    return Session(ConversationHistory.from_record(history, max_turns), lang, msg_count, last_seen)
+
+
+class SqliteSessionStore(SessionBackend):
+    """Sessions shared by every worker process through a SQLite file in WAL mode.
+
+    Each session is one row holding its encode_state() blob, so reading or
+    writing it is a single statement on the primary key.  get() does not
+    refresh last_seen (the put() that follows it does); sessions idle for
+    longer than ttl are ignored and purged every purge_every writes.
+    Two messages from the same user handled at once by different workers
+    are last-writer-wins.
+    """
+
+    def __init__(self, path, ttl=300, max_turns=20, purge_every=500, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.purge_every = purge_every
+        self._clock = clock
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(user_id TEXT PRIMARY KEY, last_seen REAL NOT NULL, state BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, user_id):
+        row = self._connect().execute(
+            "SELECT last_seen, state FROM sessions WHERE user_id = ? AND last_seen >= ?",
+            (user_id, self._clock() - self.ttl),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decode_state(row[1], row[0], self.max_turns)
+
+    def put(self, user_id, state):
+        conn = self._connect()
+        now = self._clock()
+        self._puts += 1
+        state.last_seen = now
+        if self._puts % self.purge_every == 0:
+            self.expirations += conn.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.ttl,)).rowcount
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (user_id, last_seen, state) VALUES (?, ?, ?)",
+            (user_id, now, encode_state(state)),
+        )
+
+    def pop(self, user_id, default=None):
+        state = self.get(user_id)
+        self._connect().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+        return default if state is None else state
+
+    def update(self, user_id, change):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so no other worker's put lands in between.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT last_seen, state FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+            if row is not None:
+                state = decode_state(row[1], row[0], self.max_turns)
+                change(state)
+                conn.execute("UPDATE sessions SET state = ? WHERE user_id = ?", (encode_state(state), user_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+        }
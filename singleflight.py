@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs fn; callers arriving while it is in
+    flight wait and receive the same result (or exception).  Nothing is
+    cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight; fn returns an awaitable."""
+
+    def __init__(self):
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(future)
+
+        self.executed += 1
+        future = self._calls[key] = asyncio.ensure_future(fn())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
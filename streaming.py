@@ -0,0 +1,86 @@
+import logging
+from collections import deque
+
+logger = logging.getLogger("health_assistant")
+
+
+class ParagraphStream:
+    """Cuts a streamed completion into finished paragraphs.
+
+    feed() returns each paragraph as soon as the blank line after it arrives,
+    so it can be sent while the model is still writing the rest.  Paragraphs
+    shorter than min_chars (headings, "Here is what you can do:") are held
+    and sent together with the next one.  The last paragraph is never
+    returned by feed(); remainder() gives whatever was not sent yet.
+
+    deliver() sends a paragraph from feed().  A failed send is logged rather
+    than raised, since it says nothing about the model still writing, and
+    ends the streaming: remainder() then holds everything from there on.
+    """
+
+    def __init__(self, send=None, min_chars=80):
+        self.send = send
+        self.min_chars = min_chars
+        self.text = ""
+        self.consumed = 0
+        self.delivered = 0
+        self.sent = 0
+        self.failed = False
+        self._ends = deque()  # where each paragraph returned by feed() and not yet delivered ends
+
+    def feed(self, delta: str):
+        if not self.text:
+            delta = delta.lstrip()
+        self.text += delta
+        paragraphs = []
+        if self.failed:
+            return paragraphs
+        search_from = self.consumed
+        while True:
+            end = self.text.find("\n\n", search_from)
+            if end == -1:
+                return paragraphs
+            paragraph = self.text[self.consumed:end].strip()
+            search_from = end + 2
+            if len(paragraph) < self.min_chars:
+                continue
+            self.consumed = search_from
+            self._ends.append(search_from)
+            paragraphs.append(paragraph)
+
+    def deliver(self, paragraph: str):
+        end = self._ends.popleft()
+        if self.failed:
+            return
+        try:
+            self.send(paragraph)
+        except Exception as e:
+            self._send_failed(e)
+        else:
+            self._sent(end)
+
+    async def deliver_async(self, paragraph: str):
+        """deliver() for a send that is a coroutine function."""
+        end = self._ends.popleft()
+        if self.failed:
+            return
+        try:
+            await self.send(paragraph)
+        except Exception as e:
+            self._send_failed(e)
+        else:
+            self._sent(end)
+
+    def _sent(self, end):
+        self.delivered = end
+        self.sent += 1
+
+    def _send_failed(self, error):
+        logger.error(f"Sending paragraph {self.sent + 1} failed, the rest goes in one message: {error}")
+        self.failed = True
+
+    def remainder(self, reply: str) -> str:
+        """The part of reply not sent yet; all of it unless reply starts with the streamed text."""
+        if not self.delivered or not reply.startswith(self.text[:self.delivered].rstrip()):
+            return reply
+        return reply[self.delivered:].strip()
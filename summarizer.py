@@ -0,0 +1,84 @@
+import queue
+import logging
+import threading
+
+logger = logging.getLogger("health_assistant")
+
+
+class Summarizer:
+    """Folds the older turns of long conversations into a short summary.
+
+    Work is queued from the request path and done on a daemon thread, so a
+    webhook never waits on the summarization call.  summarize_fn receives the
+    previous summary and the turns to fold and returns (summary, tokens).
+    snapshot_fn(user_id, history, keep) takes the turns to fold and
+    fold_fn(user_id, history, turns, summary, tokens) stores the result; by
+    default both work on the history that was scheduled, which is only
+    enough when that object is the stored session and nothing else touches
+    it meanwhile.
+    """
+
+    def __init__(self, summarize_fn, threshold_tokens=1000, keep_turns=4, max_pending=1000, fold_fn=None,
+                 snapshot_fn=None):
+        self.summarize_fn = summarize_fn
+        self.snapshot_fn = snapshot_fn or (lambda user_id, history, keep: history.oldest_turns(keep))
+        self.fold_fn = fold_fn or (lambda user_id, history, turns, summary, tokens: history.fold(turns, summary, tokens))
+        self.threshold_tokens = threshold_tokens
+        self.keep_turns = keep_turns
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="summarizer", daemon=True)
+                self._thread.start()
+
+    def maybe_schedule(self, user_id, history):
+        if history.total_tokens() <= self.threshold_tokens or len(history) <= self.keep_turns:
+            return False
+        with self._lock:
+            if user_id in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((user_id, history))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._pending.add(user_id)
+        self.start()
+        return True
+
+    def summarize(self, user_id, history):
+        turns = self.snapshot_fn(user_id, history, self.keep_turns)
+        if not turns:
+            return
+        summary, tokens = self.summarize_fn(history.summary, turns)
+        self.fold_fn(user_id, history, turns, summary, tokens)
+
+    def _run(self):
+        while True:
+            user_id, history = self._queue.get()
+            try:
+                self.summarize(user_id, history)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Summarization failed for {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(user_id)
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app
+
+TWILIO_ACCOUNT_SID = "AC" + "0" * 32
+
+
+class FakeServer:
+    """Local HTTP server that records every POST; respond(path, body) gives (status, JSON payload)."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self._cond = threading.Condition()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = server.respond(self.path, body)
+                with server._cond:
+                    server.requests.append((self.path, body))
+                    server._cond.notify_all()
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def wait_for(self, count, timeout=5):
+        """The requests so far, once there are at least count of them (or timeout passes)."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.requests) >= count, timeout)
+            return list(self.requests)
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeOpenAI(FakeServer):
+    """Chat completions answered by answer(messages) -> str."""
+
+    def __init__(self):
+        self.answer = lambda messages: "Drink plenty of fluids and rest."
+        super().__init__(self._complete)
+
+    def _complete(self, path, body):
+        payload = json.loads(body)
+        return 200, {
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.answer(payload["messages"])}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def chats(self):
+        return [json.loads(body) for _, body in self.requests]
+
+
+class FakeTwilio(FakeServer):
+    """Stand-in for the Messages resource of Twilio's REST API."""
+
+    def __init__(self):
+        super().__init__(self._create_message)
+
+    def _create_message(self, path, body):
+        form = parse_qs(body.decode())
+        return 201, {
+            "sid": f"SM{len(self.requests):032d}", "account_sid": TWILIO_ACCOUNT_SID, "status": "queued",
+            "to": form["To"][0], "from": form["From"][0], "body": form["Body"][0],
+        }
+
+    def messages(self, count, timeout=5):
+        """(path, To, From, Body) of the first count messages sent."""
+        sent = []
+        for path, body in self.wait_for(count, timeout)[:count]:
+            form = parse_qs(body.decode())
+            sent.append((path, form["To"][0], form["From"][0], form["Body"][0]))
+        return sent
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = FakeOpenAI()
+    monkeypatch.setattr(app, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(app, "OPENAI_BASE_URL", f"{server.url}/v1")
+    monkeypatch.setattr(app, "_clients", {})
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def fake_twilio(monkeypatch):
+    server = FakeTwilio()
+    monkeypatch.setattr(app, "TWILIO_ACCOUNT_SID", TWILIO_ACCOUNT_SID)
+    monkeypatch.setattr(app, "TWILIO_AUTH_TOKEN", "test-token")
+    monkeypatch.setattr(app, "TWILIO_API_BASE", server.url)
+    monkeypatch.setattr(app, "_clients", {})
+    yield server
+    server.close()
@@ -0,0 +1,90 @@
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+
+import app
+from conftest import TWILIO_ACCOUNT_SID
+
+BOT = "whatsapp:+14155238886"
+MESSAGES_PATH = f"/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
+
+
+@pytest.fixture
+def client(monkeypatch, fake_openai, fake_twilio):
+    monkeypatch.setattr(app, "ASYNC_REPLIES", True)
+    return app.app.test_client()
+
+
+def post(client, sid, user, body):
+    return client.post("/whatsapp", data={"MessageSid": sid, "From": user, "To": BOT, "Body": body})
+
+
+def test_reply_is_sent_through_twilio(client, fake_openai, fake_twilio):
+    user = "whatsapp:+910000000501"
+    response = post(client, "SM501", user, "My knee hurts when I climb stairs")
+    assert response.status_code == 200
+    assert "<Message>" not in response.text  # only acknowledged; the answer comes later
+
+    assert fake_twilio.messages(1) == [(MESSAGES_PATH, user, BOT, "Drink plenty of fluids and rest.")]
+    assert fake_openai.chats()[0]["messages"][-1] == {"role": "user", "content": "My knee hurts when I climb stairs"}
+    assert app.message_replies.lookup("SM501") == (True, "Drink plenty of fluids and rest.")
+
+
+def test_retried_delivery_is_answered_once(client, fake_openai, fake_twilio):
+    user = "whatsapp:+910000000502"
+    post(client, "SM502", user, "Can I eat rice with diarrhoea?")
+    fake_twilio.messages(1)
+    response = post(client, "SM502", user, "Can I eat rice with diarrhoea?")
+    assert "<Message>" not in response.text
+    assert len(fake_twilio.wait_for(2, timeout=0.3)) == 1
+
+
+def test_emergency_is_answered_without_openai(client, fake_openai, fake_twilio):
+    user = "whatsapp:+910000000503"
+    post(client, "SM503", user, "my father has chest pain")
+    (_, to, _, body), = fake_twilio.messages(1)
+    assert to == user
+    assert app.EMERGENCY_MESSAGE["en"] in body
+    assert fake_openai.requests == []
+
+
+def test_openai_failure_still_gets_an_answer(client, fake_openai, fake_twilio, monkeypatch):
+    user = "whatsapp:+910000000504"
+    monkeypatch.setattr(app, "ask_openai", lambda *args, **kwargs: 1 / 0)
+    post(client, "SM504", user, "What helps with a sore throat?")
+    (_, to, _, body), = fake_twilio.messages(1)
+    assert (to, body) == (user, app.ERROR_MESSAGE)
+    assert app.message_replies.lookup("SM504") == (False, None)  # released, so a retry is answered again
+
+
+async def asgi_post(asgi_app, data):
+    body = urlencode(data).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app({"type": "http", "method": "POST", "path": "/whatsapp", "headers": []}, receive, send)
+    return sent[0]["status"], b"".join(message.get("body", b"") for message in sent[1:]).decode()
+
+
+def test_asgi_reply_is_sent_through_twilio(client, fake_openai, fake_twilio):
+    import asgi
+
+    user = "whatsapp:+910000000505"
+
+    async def scenario():
+        status, body = await asgi_post(
+            asgi.app, {"MessageSid": "SM505", "From": user, "To": BOT, "Body": "Is it fine to walk with a sprain?"}
+        )
+        await asyncio.gather(*asgi._background)
+        await asgi.close_clients()
+        return status, body
+
+    status, body = asyncio.run(scenario())
+    assert status == 200 and "<Message>" not in body
+    assert fake_twilio.messages(1) == [(MESSAGES_PATH, user, BOT, "Drink plenty of fluids and rest.")]
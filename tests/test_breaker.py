@@ -0,0 +1,74 @@
+import pytest
+
+from breaker import CircuitBreaker, CircuitOpen
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(breaker, error=ConnectionError("upstream down")):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+def test_opens_after_threshold_failures_in_a_row():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=FakeClock())
+    fail(breaker)
+    fail(breaker)
+    with breaker.guard():
+        pass  # a success resets the count
+    fail(breaker)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        with breaker.guard():
+            pass
+    assert breaker.rejected == 1
+
+
+def test_half_open_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    fail(breaker)
+    clock.now = 30
+    with breaker.guard():
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpen):
+            breaker.before_call()  # a second caller while the trial runs
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_opens_again():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    fail(breaker)
+    clock.now = 30
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 59
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    assert breaker.transitions == {"open": 2, "half_open": 1, "closed": 0}
+
+
+def test_errors_that_are_not_failures_do_not_count():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, is_failure=lambda e: not isinstance(e, ValueError),
+                             clock=clock)
+    fail(breaker, ValueError("bad request"))
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker)
+    clock.now = 30
+    fail(breaker, ValueError("bad request"))
+    # The trial told us nothing, so the next caller may try again.
+    with breaker.guard():
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,13 @@
+import app
+
+
+def test_burst_reply_gets_a_full_deadline(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.reply_jobs, "submit", lambda fn, *args, key=None: submitted.append(args) or True)
+    app.deliver_burst("whatsapp:+910000000401", [
+        ("SM1", "whatsapp:+14155238886", "fever"),
+        ("SM2", "whatsapp:+14155238886", "since 3 days"),
+    ])
+    (sid, from_number, to_number, body, media_url, num_media, deadline, merged_sids), = submitted
+    assert (sid, body, merged_sids) == ("SM1", "fever\nsince 3 days", ["SM2"])
+    assert deadline.remaining() > app.REPLY_DEADLINE - 0.05
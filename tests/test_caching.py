@@ -0,0 +1,35 @@
+import os
+
+from caching import TranscriptCache
+
+
+def age(cache, digest, seconds):
+    path = cache._disk_path(digest)
+    mtime = os.stat(path).st_mtime - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_transcripts_survive_restarts_on_disk(tmp_path):
+    TranscriptCache(disk_dir=str(tmp_path)).put("ab12", "I have a cough", media_sid="ME1")
+    cache = TranscriptCache(disk_dir=str(tmp_path))
+    assert cache.get_by_sid("ME1") is None
+    assert cache.get("ab12", "ME1") == "I have a cough"
+    assert cache.get_by_sid("ME1") == "I have a cough"
+    assert cache.get("cd34") is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["sid_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_unused_disk_transcripts_are_purged(tmp_path):
+    cache = TranscriptCache(disk_dir=str(tmp_path), max_disk_age=3600, purge_every=3)
+    cache.put("aa01", "old")
+    cache.put("bb02", "old but read again")
+    age(cache, "aa01", 7200)
+    age(cache, "bb02", 7200)
+    TranscriptCache(disk_dir=str(tmp_path)).get("bb02")  # refreshes its mtime
+    cache.put("cc03", "new")  # third write purges
+
+    assert not os.path.exists(cache._disk_path("aa01"))
+    assert os.path.exists(cache._disk_path("bb02"))
+    assert os.path.exists(cache._disk_path("cc03"))
+    assert cache.stats()["disk_purged"] == 1
@@ -0,0 +1,86 @@
+import types
+import asyncio
+
+import pytest
+
+import deadline as deadline_module
+from deadline import Deadline, DeadlineExceeded, retry, retry_async
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(deadline_module, "retry_pause", lambda attempt: 1.0)
+    sleep = lambda seconds: setattr(clock, "now", clock.now + seconds)
+    monkeypatch.setattr(deadline_module, "time", types.SimpleNamespace(sleep=sleep))
+    return clock
+
+
+def test_timeouts_shrink_with_the_budget(clock):
+    deadline = Deadline(10, clock=clock)
+    assert deadline.timeout(cap=4) == 4
+    clock.now = 8
+    assert deadline.timeout(cap=4) == 2
+    clock.now = 10
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
+
+
+def test_retry_stops_when_the_next_pause_does_not_fit(clock):
+    deadline = Deadline(2.5, clock=clock)  # 1 s pauses
+    timeouts = []
+
+    def call(timeout):
+        timeouts.append(timeout)
+        raise ConnectionError("reset")
+
+    with pytest.raises(DeadlineExceeded) as raised:
+        retry(call, ConnectionError, tries=5, deadline=deadline, default_timeout=30)
+    assert timeouts == [2.5, 1.5, 0.5]
+    assert isinstance(raised.value.__cause__, ConnectionError)
+
+
+def test_retry_stops_when_a_call_uses_up_the_budget(clock):
+    deadline = Deadline(5, clock=clock)
+
+    def call(timeout):
+        clock.now += timeout
+        raise TimeoutError("read timed out")
+
+    with pytest.raises(DeadlineExceeded, match="deadline exceeded"):
+        retry(call, TimeoutError, tries=3, deadline=deadline)
+
+
+def test_retry_without_deadline_re_raises_after_the_last_try(clock):
+    calls = []
+
+    def call(timeout):
+        calls.append(timeout)
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        retry(call, ConnectionError, tries=3, default_timeout=30)
+    assert calls == [30, 30, 30]
+
+
+def test_retry_async_stops_when_the_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(deadline_module, "retry_pause", lambda attempt: 0.05)
+    deadline = Deadline(0.08)
+    calls = []
+
+    async def call(timeout):
+        calls.append(timeout)
+        raise ConnectionError("reset")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(retry_async(call, ConnectionError, tries=5, deadline=deadline))
+    assert len(calls) == 2
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from debounce import AsyncDebouncer, Debouncer
+
+
+class Collector:
+    def __init__(self):
+        self.flushed = []
+        self.event = threading.Event()
+
+    def __call__(self, key, items):
+        self.flushed.append((key, items))
+        self.event.set()
+
+
+def test_quick_items_are_flushed_together():
+    collect = Collector()
+    bursts = Debouncer(collect, window=0.1)
+    for body in ("fever", "since 3 days", "child 5 yrs"):
+        bursts.add("u1", body)
+    assert collect.event.wait(5)
+    assert collect.flushed == [("u1", ["fever", "since 3 days", "child 5 yrs"])]
+    assert bursts.stats() == {"pending": 0, "bursts": 1, "merged": 2}
+
+
+def test_keys_are_flushed_separately():
+    collect = Collector()
+    bursts = Debouncer(collect, window=0.05)
+    bursts.add("u1", "fever")
+    bursts.add("u2", "cough")
+    while len(collect.flushed) < 2:
+        assert collect.event.wait(5)
+        collect.event.clear()
+    assert sorted(collect.flushed) == [("u1", ["fever"]), ("u2", ["cough"])]
+
+
+def test_flush_hands_over_at_once():
+    collect = Collector()
+    bursts = Debouncer(collect, window=60)
+    bursts.add("u1", "fever")
+    bursts.flush("u1")
+    bursts.flush("u1")  # nothing left
+    assert collect.flushed == [("u1", ["fever"])]
+
+
+def test_burst_is_not_held_past_max_wait():
+    collect = Collector()
+    bursts = Debouncer(collect, window=60, max_wait=0.1)
+    bursts.add("u1", "fever")
+    # A chatty user keeps the window open; max_wait still hands the burst over.
+    assert collect.event.wait(5)
+    bursts.add("u1", "since 3 days")
+    bursts.flush("u1")
+    assert collect.flushed == [("u1", ["fever"]), ("u1", ["since 3 days"])]
+
+
+def test_async_debouncer_merges_and_caps_the_wait():
+    async def scenario():
+        flushed = []
+        bursts = AsyncDebouncer(lambda key, items: flushed.append(items), window=60, max_wait=0.1)
+        for body in ("a", "b", "c", "d", "e"):
+            bursts.add("u1", body)
+            await asyncio.sleep(0.04)
+        bursts.flush("u1")
+        return flushed, bursts.stats()
+
+    flushed, stats = asyncio.run(scenario())
+    # The window never closed, so only max_wait split the burst.
+    assert len(flushed) >= 2
+    assert [item for items in flushed for item in items] == ["a", "b", "c", "d", "e"]
+    assert stats["pending"] == 0
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from dedupe import MemoryDedupeCache, SqliteDedupeCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryDedupeCache(max_entries=100, ttl=60)
+    return SqliteDedupeCache(str(tmp_path / "dedupe.db"), ttl=60)
+
+
+def test_first_delivery_claims_and_retries_get_the_reply(cache):
+    assert cache.claim("SM1")
+    assert not cache.claim("SM1")
+    assert cache.lookup("SM1") == (True, None)  # in flight
+    cache.complete("SM1", "Drink fluids.")
+    assert cache.lookup("SM1") == (True, "Drink fluids.")
+    assert cache.stats()["duplicates"] == 1
+
+
+def test_released_sid_can_be_claimed_again(cache):
+    assert cache.claim("SM2")
+    cache.release("SM2")
+    assert cache.lookup("SM2") == (False, None)
+    assert cache.claim("SM2")
+
+
+def test_run_computes_once(cache):
+    calls = []
+    assert cache.run("SM3", lambda: calls.append(1) or "Rest.") == ("Rest.", False)
+    assert cache.run("SM3", lambda: calls.append(1) or "Rest.") == ("Rest.", True)
+    assert calls == [1]
+
+
+def test_run_releases_on_error(cache):
+    with pytest.raises(ZeroDivisionError):
+        cache.run("SM4", lambda: 1 / 0)
+    assert cache.run("SM4", lambda: "Rest.") == ("Rest.", False)
+
+
+def test_retry_waits_for_the_reply_in_flight(cache):
+    assert cache.claim("SM5")
+    threading.Timer(0.05, cache.complete, ("SM5", "Rest.")).start()
+    assert cache.wait("SM5", timeout=5) == "Rest."
+
+
+def test_expired_entries_are_claimed_again(tmp_path):
+    memory = MemoryDedupeCache(ttl=-1)
+    sqlite = SqliteDedupeCache(str(tmp_path / "dedupe.db"), ttl=-1)
+    for cache in (memory, sqlite):
+        assert cache.claim("SM6")
+        cache.complete("SM6", "Rest.")
+        assert cache.claim("SM6")
+
+
+def test_memory_cache_is_bounded():
+    cache = MemoryDedupeCache(max_entries=2)
+    for sid in ("SM7", "SM8", "SM9"):
+        assert cache.claim(sid)
+    assert cache.lookup("SM7") == (False, None)
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+import app
+from hedging import HedgePolicy
+
+SLOW = 0.2
+
+
+@pytest.fixture
+def slow_first_copy(fake_openai):
+    """The first request for each question takes SLOW seconds; a backup copy of it answers at once."""
+    arrivals = {}
+    lock = threading.Lock()
+
+    def answer(messages):
+        question = messages[-1]["content"]
+        with lock:
+            times = arrivals.setdefault(question, [])
+            times.append(time.monotonic())
+            first = len(times) == 1
+        if first:
+            time.sleep(SLOW)
+            return "first copy"
+        return "backup copy"
+
+    fake_openai.answer = answer
+    return arrivals
+
+
+def hedge_after(delay, monkeypatch, **kwargs):
+    policy = HedgePolicy(min_samples=1, **kwargs)
+    policy.record(delay)  # one sample is enough: the delay is now its latency
+    # One unhedged request first, so client setup does not hold back the first copy.
+    app.chat_completion([{"role": "user", "content": "warm-up"}])
+    monkeypatch.setattr(app, "hedge_policy", policy)
+    return policy
+
+
+def ask(question):
+    return app.chat_completion([{"role": "user", "content": question}], hedge=True)
+
+
+def test_backup_is_sent_after_the_delay_and_the_first_answer_wins(slow_first_copy, monkeypatch):
+    policy = hedge_after(0.05, monkeypatch, max_rate=1.0)
+    started = time.monotonic()
+    assert ask("Is a fever of 101 dangerous?") == "backup copy"
+    assert time.monotonic() - started < SLOW
+
+    first, backup = slow_first_copy["Is a fever of 101 dangerous?"]
+    assert backup - started >= 0.05
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+
+def test_fast_answers_are_not_hedged(fake_openai, monkeypatch):
+    policy = hedge_after(0.5, monkeypatch, max_rate=1.0)
+    assert ask("Can I drink coconut water?") == "Drink plenty of fluids and rest."
+    assert len(fake_openai.wait_for(3, timeout=0.6)) == 2  # the warm-up and the question, no backup
+    assert policy.hedges == 0
+
+
+def test_backups_are_capped_at_max_rate(slow_first_copy, monkeypatch):
+    policy = hedge_after(0.02, monkeypatch, max_rate=0.25, burst=1)
+    replies = [ask(f"question {i}") for i in range(8)]
+    # One token to start with, then one more for every four requests.
+    assert replies.count("backup copy") == 2
+    assert replies.count("first copy") == 6
+    assert sum(len(times) for times in slow_first_copy.values()) == 1 + 10
+    assert policy.stats()["hedge_rate"] == 0.25
@@ -0,0 +1,78 @@
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import history
+from history import ConversationHistory, count_tokens, get_encoding
+
+
+class FakeEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    tiktoken = SimpleNamespace(loads=0, online=True)
+
+    def encoding_for_model(model):
+        raise KeyError(model)
+
+    def load(name):
+        tiktoken.loads += 1
+        if not tiktoken.online:
+            raise ConnectionError("cannot download o200k_base")
+        return FakeEncoding()
+
+    tiktoken.encoding_for_model = encoding_for_model
+    tiktoken.get_encoding = load
+    monkeypatch.setitem(sys.modules, "tiktoken", tiktoken)
+    monkeypatch.setattr(history, "_encodings", {})
+    return tiktoken
+
+
+def wait_for_load(model):
+    for _ in range(500):
+        if history._encodings.get(model) != float("inf"):
+            return
+        time.sleep(0.01)
+
+
+def test_tokenizer_loads_in_the_background(fake_tiktoken):
+    assert get_encoding("some-new-model") is None  # nobody waits for the download
+    assert count_tokens("I have a fever", "some-new-model") > 0
+    wait_for_load("some-new-model")
+    assert isinstance(get_encoding("some-new-model"), FakeEncoding)
+    assert count_tokens("I have a fever", "some-new-model") == history.MESSAGE_OVERHEAD_TOKENS + 4
+    assert fake_tiktoken.loads == 1
+
+
+def test_failed_load_is_tried_again_later(fake_tiktoken, monkeypatch):
+    fake_tiktoken.online = False
+    get_encoding("some-new-model")
+    wait_for_load("some-new-model")
+    assert get_encoding("some-new-model") is None
+    assert fake_tiktoken.loads == 1  # not retried on every message
+
+    fake_tiktoken.online = True
+    monkeypatch.setitem(history._encodings, "some-new-model", time.monotonic())  # retry time reached
+    get_encoding("some-new-model")
+    wait_for_load("some-new-model")
+    assert isinstance(get_encoding("some-new-model"), FakeEncoding)
+
+
+def test_fold_keeps_new_turns_and_skips_dropped_ones():
+    history = ConversationHistory(max_turns=4)
+    for i in range(4):
+        history.append("user" if i % 2 == 0 else "assistant", f"turn {i}", 5)
+    snapshot = history.oldest_turns(1)  # turns 0-2
+    history.append("user", "turn 4", 5)  # turn 0 falls out meanwhile
+    history.fold(snapshot, "summary", 3)
+    assert [content for _, content, _ in history.oldest_turns(0)] == ["turn 3", "turn 4"]
+    assert history.total_tokens() == 3 + 10
+
+    history.fold(snapshot, "newer summary", 4)  # nothing left of the snapshot
+    assert len(history) == 2
+    assert history.summary == "newer summary"
@@ -0,0 +1,39 @@
+import threading
+
+from jobs import JobQueue
+
+
+def test_jobs_with_a_key_run_in_submission_order():
+    jobs = JobQueue(workers=4, name="test-keyed")
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    def first():
+        started.set()
+        release.wait(5)
+        order.append("fever")
+
+    assert jobs.submit(first, key="u1")
+    assert started.wait(5)
+    # Three workers are idle, but the goodbye waits for the question before it.
+    assert jobs.submit(order.append, "bye", key="u1")
+    assert jobs.submit(order.append, "other user", key="u2")
+    assert jobs.stats()["held_in_order"] == 1
+    release.set()
+    jobs.join()
+    assert order.index("fever") < order.index("bye")
+    assert jobs.stats()["held_in_order"] == 0
+    assert jobs.stats()["completed"] == 3
+
+
+def test_held_jobs_count_against_max_pending():
+    jobs = JobQueue(workers=1, max_pending=2, name="test-bounded")
+    started, release = threading.Event(), threading.Event()
+    assert jobs.submit(lambda: started.set() or release.wait(5), key="u1")
+    assert started.wait(5)
+    assert jobs.submit(release.wait, 5, key="u1")
+    assert jobs.submit(release.wait, 5, key="u1")
+    assert not jobs.submit(release.wait, 5, key="u1")  # two held already
+    assert jobs.stats()["rejected"] == 1
+    release.set()
+    jobs.join()
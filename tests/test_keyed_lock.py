@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from keyed_lock import AsyncKeyedLock, KeyedLock
+
+
+def test_waiters_are_served_in_arrival_order():
+    locks = KeyedLock()
+    order = []
+    assert locks.acquire("u1")
+
+    def wait(i):
+        with locks.hold("u1"):
+            order.append(i)
+
+    threads = []
+    for i in range(3):
+        threads.append(threading.Thread(target=wait, args=(i,)))
+        threads[-1].start()
+        while locks.stats()["waited"] <= i:  # queued behind the holder before the next one starts
+            time.sleep(0.001)
+    locks.release("u1")
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2]
+    assert locks.stats() == {"busy": 0, "acquired": 4, "waited": 3, "timeouts": 0}
+
+
+def test_keys_do_not_block_each_other():
+    locks = KeyedLock()
+    with locks.hold("u1"):
+        assert locks.acquire("u2", timeout=0)
+        locks.release("u2")
+
+
+def test_hold_gives_up_at_the_deadline():
+    locks = KeyedLock()
+    with locks.hold("u1"):
+        with pytest.raises(DeadlineExceeded):
+            with locks.hold("u1", Deadline(0.05)):
+                pass
+    assert locks.stats()["timeouts"] == 1
+    assert locks.stats()["busy"] == 0
+
+
+def test_hold_if_free_never_waits():
+    locks = KeyedLock()
+    with locks.hold("u1"):
+        with locks.hold_if_free("u1") as taken:
+            assert not taken
+    with locks.hold_if_free("u1") as taken:
+        assert taken
+    assert locks.stats()["busy"] == 0
+
+
+def test_async_lock_skips_cancelled_waiters():
+    async def scenario():
+        locks = AsyncKeyedLock()
+        order = []
+        await locks.acquire("u1")
+
+        async def wait(i):
+            async with locks.hold("u1"):
+                order.append(i)
+
+        first, second, third = (asyncio.create_task(wait(i)) for i in range(3))
+        await asyncio.sleep(0)
+        second.cancel()
+        locks.release("u1")
+        await asyncio.gather(first, second, third, return_exceptions=True)
+        return order, locks.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == [0, 2]
+    assert stats["busy"] == 0
@@ -0,0 +1,50 @@
+import pytest
+
+from app import KEYWORDS, is_urgent
+from keywords import KeywordMatcher
+
+
+@pytest.mark.parametrize("message, word", [
+    ("my hand has severe burns", "burn"),
+    ("child was poisoned", "poison"),
+    ("he had seizures", "seizure"),
+    ("I think it is fractured", "fracture"),
+])
+def test_inflected_emergency_words_are_critical(message, word):
+    hits = KEYWORDS.scan(message)
+    assert word in hits["critical"]
+    assert is_urgent(hits)
+
+
+def test_keyword_must_start_a_word():
+    assert KEYWORDS.scan("heartburn since morning") == {}
+
+
+def test_exit_words_stay_whole_words():
+    assert KEYWORDS.scan("I know") == {}
+    assert KEYWORDS.scan("nobody is home") == {}
+    assert KEYWORDS.scan("ok bye") == {"exit": ["bye"]}
+
+
+def test_all_categories_whole_word_by_default():
+    matcher = KeywordMatcher({"symptom": ["burn"]})
+    assert matcher.scan("burns") == {}
+    assert matcher.scan("a burn") == {"symptom": ["burn"]}
+
+
+def test_message_is_scanned_once(monkeypatch):
+    import app
+
+    scans = []
+
+    class CountingMatcher:
+        def scan(self, text):
+            scans.append(text)
+            return KEYWORDS.scan(text)
+
+    monkeypatch.setattr(app, "KEYWORDS", CountingMatcher())
+    monkeypatch.setattr(app, "ask_openai", lambda history, message, lang, paragraphs=None, deadline=None: "Rest.")
+    client = app.app.test_client()
+    client.post("/whatsapp", data={"MessageSid": "SM801", "From": "whatsapp:+910000000801", "Body": "my leg burns"})
+    client.post("/whatsapp", data={"MessageSid": "SM802", "From": "whatsapp:+910000000801", "Body": "what can I eat"})
+    assert scans == ["my leg burns", "what can I eat"]
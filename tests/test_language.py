@@ -0,0 +1,17 @@
+import app
+from language import LanguageDetector
+
+
+def test_default_guess_is_not_remembered():
+    detector = LanguageDetector(supported=["en", "hi"])
+    assert detector.detect("123", "u1") == "en"
+    assert detector.detect("मुझे बुखार है", "u1") == "hi"
+    assert detector.detect("I have a fever", "u1") == "hi"  # remembered from the last message
+
+
+def test_new_conversation_detects_language_again(monkeypatch):
+    monkeypatch.setattr(app, "ask_openai", lambda history, message, lang, paragraphs=None, deadline=None: "Okay.")
+    user = "whatsapp:+910000000301"
+    app.process_message(user, "I have a fever")
+    app.process_message(user, "bye")
+    assert app.detect_language("मुझे बुखार है", user) == "hi"
@@ -0,0 +1,108 @@
+import asyncio
+from contextlib import nullcontext
+
+import pytest
+
+from limiter import AdaptiveLimiter, AsyncAdaptiveLimiter, LimitExceeded, overload_hint, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def call(limiter, error=None):
+    with pytest.raises(type(error)) if error else nullcontext():
+        with limiter.slot():
+            if error:
+                raise error
+
+
+def test_healthy_calls_grow_the_limit_from_the_initial_value(clock):
+    limiter = AdaptiveLimiter(initial=4, max_limit=6, clock=clock)
+    for _ in range(5):  # about one more per round of calls
+        call(limiter)
+    assert limiter.stats()["limit"] == 5
+    for _ in range(50):
+        call(limiter)
+    assert limiter.stats()["limit"] == 6
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_overload_halves_the_limit_once_per_interval(clock, status):
+    limiter = AdaptiveLimiter(initial=16, decrease_interval=1.0, clock=clock)
+    call(limiter, HTTPError(status))
+    call(limiter, HTTPError(status))
+    assert limiter.stats()["limit"] == 8
+    clock.now += 1.0
+    call(limiter, HTTPError(status))
+    stats = limiter.stats()
+    assert (stats["limit"], stats["overloads"], stats["decreases"]) == (4, 3, 2)
+
+
+def test_client_errors_do_not_shrink_the_limit(clock):
+    limiter = AdaptiveLimiter(initial=4, clock=clock)
+    call(limiter, HTTPError(400))
+    assert limiter.stats()["overloads"] == 0
+    assert limiter.limit > 4
+
+
+def test_retry_after_closes_the_gate_until_it_passes(clock):
+    limiter = AdaptiveLimiter(initial=4, max_wait=1.0, clock=clock)
+    call(limiter, HTTPError(429, retry_after="30"))
+    assert limiter.stats()["closed_for"] == 30
+    with pytest.raises(LimitExceeded, match="upstream asked to wait"):
+        limiter.acquire()
+    clock.now += 30
+    call(limiter)
+    assert limiter.rejected == 1
+
+
+def test_full_limiter_raises_after_max_wait():
+    limiter = AdaptiveLimiter(initial=1, max_wait=0.05)
+    started = limiter.acquire()
+    with pytest.raises(LimitExceeded, match="1 calls in flight"):
+        limiter.acquire()
+    limiter.release(started)
+    limiter.release(limiter.acquire())
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_async_limiter_waits_for_a_slot_then_gives_up():
+    async def scenario():
+        limiter = AsyncAdaptiveLimiter(initial=1, max_limit=1, max_wait=0.2)
+        first = await limiter.acquire()
+        asyncio.get_running_loop().call_later(0.02, limiter.release, first)
+        limiter.release(await limiter.acquire())  # woken by the release
+        held = await limiter.acquire()
+        limiter.max_wait = 0.02
+        with pytest.raises(LimitExceeded):
+            await limiter.acquire()
+        limiter.release(held)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["admitted"], stats["rejected"]) == (3, 1)
+
+
+def test_overload_hints():
+    assert overload_hint(HTTPError(429, retry_after="2")) == (True, 2.0)
+    assert overload_hint(HTTPError(404)) == (False, None)
+    assert overload_hint(TimeoutError()) == (True, None)
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,44 @@
+import pytest
+
+from semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(threshold=0.8)
+
+
+def test_reworded_question_reuses_the_answer(cache):
+    cache.put("en", "I have fever and cough", "Rest and drink fluids.")
+    assert cache.get("en", "I have fever + cough") == "Rest and drink fluids."
+    assert cache.get("en", "i have fever and cough!!") == "Rest and drink fluids."
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("I have fever and cough", "I have no fever and cough"),
+    ("I have no fever and cough", "I have fever and cough"),
+    ("I don't have fever and cough", "I have fever and cough"),
+    ("my 2 year old has diarrhea", "my 12 year old has diarrhea"),
+    ("my 12 year old has diarrhea", "my 2 year old has diarrhea"),
+    ("मुझे बुखार है", "मुझे बुखार नहीं है"),
+])
+def test_numbers_and_negations_must_match(cache, cached, asked):
+    cache.put("en", cached, "cached answer")
+    assert cache.get("en", asked) is None
+    assert cache.get("en", cached) == "cached answer"
+
+
+def test_languages_do_not_share_answers(cache):
+    cache.put("hi", "I have fever and cough", "हिंदी उत्तर")
+    assert cache.get("en", "I have fever and cough") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_oldest_entries_are_evicted():
+    cache = SemanticCache(max_entries=2)
+    for i, question in enumerate(["I have a headache", "my back hurts a lot", "my throat is sore"]):
+        cache.put("en", question, f"answer {i}")
+    assert len(cache) == 2
+    assert cache.get("en", "I have a headache") is None
+    assert cache.get("en", "my throat is sore") == "answer 2"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,144 @@
+import pytest
+
+from history import ConversationHistory
+from session_store import Session, SessionStore, SqliteSessionStore
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def session(lang="en", *turns):
+    history = ConversationHistory()
+    for role, content in turns:
+        history.append(role, content, 5)
+    return Session(history, lang)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_sessions_expire_after_ttl(clock):
+    store = SessionStore(ttl=300, clock=clock)
+    store.put("whatsapp:+911", session())
+    clock.now += 299
+    assert store.get("whatsapp:+911") is not None
+    clock.now += 299  # get() refreshed last_seen, so still alive
+    assert store.get("whatsapp:+911") is not None
+    clock.now += 301
+    assert store.get("whatsapp:+911") is None
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (2, 1, 1, 0)
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(max_entries=2, clock=clock)
+    store.put("whatsapp:+911", session("en"))
+    store.put("whatsapp:+912", session("hi"))
+    store.get("whatsapp:+911")
+    store.put("whatsapp:+913", session("mr"))
+    assert store.get("whatsapp:+912") is None
+    assert store.get("whatsapp:+911").lang == "en"
+    assert store.get("whatsapp:+913").lang == "mr"
+    assert store.stats()["evictions"] == 1
+    assert len(store) == 2
+
+
+def test_pop_and_update(clock):
+    store = SessionStore(clock=clock)
+    store.put("whatsapp:+911", session())
+    store.update("whatsapp:+911", lambda state: setattr(state, "msg_count", 3))
+    store.update("whatsapp:+919", lambda state: pytest.fail("no such session"))
+    assert store.get("whatsapp:+911").msg_count == 3
+    assert store.pop("whatsapp:+911").msg_count == 3
+    assert store.pop("whatsapp:+911", "gone") == "gone"
+
+
+def test_stats_report_occupancy(clock):
+    store = SessionStore(max_entries=4, clock=clock)
+    store.put("whatsapp:+911", session())
+    store.put("not-a-phone-number", session())
+    stats = store.stats()
+    assert stats["backend"] == "memory"
+    assert stats["size"] == 2
+    assert stats["occupancy"] == 0.5
+
+
+def test_idle_sessions_are_compressed_and_rehydrated_on_get(clock):
+    store = SessionStore(ttl=300, cold_after=60, clock=clock)
+    state = session("hi", ("user", "मुझे बुखार है"), ("assistant", "आराम करें।"))
+    store.put("whatsapp:+911", state)
+    clock.now += 61
+    store.put("whatsapp:+912", session())  # any call cools idle sessions
+    assert store.stats()["cold"] == 1
+    assert state.history.window(100)  # a message still holding it is unaffected
+
+    thawed = store.get("whatsapp:+911")
+    assert thawed is not state
+    assert (thawed.lang, thawed.history.window(100)) == ("hi", state.history.window(100))
+    stats = store.stats()
+    assert (stats["cold"], stats["compressions"], stats["rehydrations"]) == (0, 1, 1)
+
+
+def test_update_of_a_cold_session_keeps_it_cold(clock):
+    store = SessionStore(cold_after=60, clock=clock)
+    store.put("whatsapp:+911", session("en", ("user", "I have a cough")))
+    clock.now += 61
+    store.get("whatsapp:+919")
+    store.update("whatsapp:+911", lambda state: state.history.fold(state.history.oldest_turns(0), "cough", 3))
+    assert store.stats()["cold"] == 1
+    state = store.pop("whatsapp:+911")
+    assert (state.history.summary, len(state.history)) == ("cough", 0)
+
+
+def test_cold_sessions_still_expire_and_are_evicted_first(clock):
+    store = SessionStore(max_entries=2, ttl=300, cold_after=60, clock=clock)
+    store.put("whatsapp:+911", session())
+    clock.now += 61
+    store.put("whatsapp:+912", session())
+    store.put("whatsapp:+913", session())
+    assert store.get("whatsapp:+911") is None
+    assert store.stats()["evictions"] == 1
+
+    clock.now += 250  # +912 and +913 go cold, then expire
+    store.get("whatsapp:+919")
+    clock.now += 100
+    assert store.get("whatsapp:+912") is None
+    assert len(store) == 0
+
+
+def test_sqlite_sessions_round_trip(tmp_path, clock):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"), clock=clock)
+    store.put("whatsapp:+911", session("bn", ("user", "আমার জ্বর"), ("assistant", "বিশ্রাম নিন।")))
+    state = store.get("whatsapp:+911")
+    assert (state.lang, state.last_seen) == ("bn", clock.now)
+    assert state.history.window(100) == [
+        {"role": "user", "content": "আমার জ্বর"}, {"role": "assistant", "content": "বিশ্রাম নিন।"},
+    ]
+
+    store.update("whatsapp:+911", lambda state: state.history.fold(state.history.oldest_turns(1), "fever", 2))
+    store.update("whatsapp:+919", lambda state: pytest.fail("no such session"))
+    state = store.get("whatsapp:+911")
+    assert (state.history.summary, len(state.history)) == ("fever", 1)
+
+    assert store.pop("whatsapp:+911").history.summary == "fever"
+    assert store.get("whatsapp:+911") is None
+    assert store.pop("whatsapp:+911", "gone") == "gone"
+
+
+def test_sqlite_sessions_expire_and_are_purged(tmp_path, clock):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"), ttl=300, purge_every=2, clock=clock)
+    store.put("whatsapp:+911", session())
+    clock.now += 301
+    assert store.get("whatsapp:+911") is None
+    store.put("whatsapp:+912", session())  # every second put purges
+    stats = store.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["expirations"]) == (1, 0, 1, 1)
+    # Another process sees the same rows.
+    assert SqliteSessionStore(str(tmp_path / "sessions.db"), clock=clock).get("whatsapp:+912") is not None
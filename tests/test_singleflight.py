@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "Drink fluids."
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, ("en", "fever"), fetch) for _ in range(4)]
+        while flight.coalesced < 3:
+            time.sleep(0.005)
+        release.set()
+        assert [future.result() for future in futures] == ["Drink fluids."] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 3}
+
+
+def test_waiters_get_the_leaders_error_and_nothing_is_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise TimeoutError("upstream timed out")
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, "fever", fail) for _ in range(2)]
+        while flight.coalesced < 1:
+            time.sleep(0.005)
+        release.set()
+        for future in futures:
+            with pytest.raises(TimeoutError):
+                future.result()
+    assert flight.do("fever", lambda: "retried") == "retried"
+    assert flight.executed == 2
+
+
+def test_async_callers_share_one_call_and_its_error():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "Drink fluids."
+
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise TimeoutError("upstream timed out")
+
+    async def scenario():
+        answers = await asyncio.gather(*(flight.do("fever", fetch) for _ in range(3)))
+        errors = await asyncio.gather(*(flight.do("cough", fail) for _ in range(2)), return_exceptions=True)
+        return answers, errors
+
+    answers, errors = asyncio.run(scenario())
+    assert answers == ["Drink fluids."] * 3
+    assert len(calls) == 1
+    assert all(isinstance(error, TimeoutError) for error in errors)
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 3}
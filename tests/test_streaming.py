@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import app
+from streaming import ParagraphStream
+
+FIRST = "Drink plenty of fluids and rest as much as you can for the next two or three days."
+SECOND = "Take paracetamol for the fever, but not more than four times in twenty-four hours."
+THIRD = "See a doctor if it lasts longer."
+REPLY = f"{FIRST}\n\n{SECOND}\n\n{THIRD}"
+
+
+class FakeStream:
+    def __init__(self, text):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 16]))])
+            for i in range(0, len(text), 16)
+        ]
+
+    def __enter__(self):
+        return iter(self.chunks)
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_openai_client(text):
+    create = lambda **kwargs: FakeStream(text)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_paragraphs_are_sent_as_they_finish():
+    sent = []
+    paragraphs = ParagraphStream(send=sent.append)
+    for i in range(0, len(REPLY), 16):
+        for paragraph in paragraphs.feed(REPLY[i:i + 16]):
+            paragraphs.deliver(paragraph)
+    assert sent == [FIRST, SECOND]
+    assert paragraphs.remainder(REPLY) == THIRD
+
+
+def test_failed_send_is_not_an_openai_failure(monkeypatch):
+    sent = []
+
+    def send(body):
+        if sent:
+            raise ConnectionError("Twilio is down")
+        sent.append(body)
+
+    monkeypatch.setattr(app, "get_openai_client", lambda: fake_openai_client(REPLY))
+    failures = app.openai_breaker.failures
+    paragraphs = ParagraphStream(send=send)
+    assert app.stream_chat_completion([], paragraphs) == REPLY
+    assert app.openai_breaker.failures == failures
+    assert sent == [FIRST]
+    # Everything from the failed paragraph on goes out with the final message.
+    assert paragraphs.remainder(REPLY) == f"{SECOND}\n\n{THIRD}"
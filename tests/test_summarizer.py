@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import app
+from history import ConversationHistory
+from session_store import Session
+
+SUMMARY = "Adult with fever for two days and a headache; advised fluids and paracetamol."
+EARLIER = [
+    ("user", "I have had a fever for two days"),
+    ("assistant", "Drink plenty of fluids and rest."),
+    ("user", "I also have a headache"),
+    ("assistant", "Paracetamol can help with both."),
+    ("user", "How much paracetamol can I take?"),
+    ("assistant", "500 mg up to four times a day."),
+    ("user", "Can I take it with food?"),
+    ("assistant", "Yes, with or without food."),
+]
+
+
+def is_summary_request(messages):
+    return messages[0]["content"].startswith("Summarize this health conversation")
+
+
+def test_summary_keeps_turns_added_meanwhile(fake_openai):
+    user = "whatsapp:+910000000601"
+    history = ConversationHistory(app.HISTORY_MAX_TURNS)
+    for role, content in EARLIER:
+        history.append(role, content, app.count_tokens(content, app.OPENAI_MODEL))
+    app.user_sessions[user] = Session(history, "en", 4)
+
+    summarizing, finish = threading.Event(), threading.Event()
+
+    def answer(messages):
+        if is_summary_request(messages):
+            summarizing.set()
+            finish.wait(5)
+            return SUMMARY
+        return "Check your temperature every six hours."
+
+    fake_openai.answer = answer
+    worker = threading.Thread(target=app.summarizer.summarize, args=(user, history))
+    worker.start()
+    assert summarizing.wait(5)
+
+    # The user writes again while the summary is being written.
+    app.process_message(user, "The fever is still there today")
+    finish.set()
+    worker.join(5)
+
+    keep = app.summarizer.keep_turns
+    history = app.user_sessions.get(user).history
+    assert history.summary == SUMMARY
+    assert [content for _, content, _ in history.oldest_turns(0)] == [content for _, content in EARLIER[-keep:]] + [
+        "The fever is still there today", "Check your temperature every six hours.",
+    ]
+
+    # The next question is sent with the summary instead of the folded turns.
+    app.process_message(user, "Should I see a doctor?")
+    messages = fake_openai.chats()[-1]["messages"]
+    assert messages[1] == {"role": "system", "content": f"Summary of the earlier conversation: {SUMMARY}"}
+    assert messages[2:] == [{"role": role, "content": content} for role, content in EARLIER[-keep:]] + [
+        {"role": "user", "content": "The fever is still there today"},
+        {"role": "assistant", "content": "Check your temperature every six hours."},
+        {"role": "user", "content": "Should I see a doctor?"},
+    ]
+    folded = {content for _, content in EARLIER[:-keep]}
+    assert not folded & {message["content"] for message in messages}
+
+
+def test_asgi_fold_waits_for_the_async_turn(tmp_path, monkeypatch):
+    import asgi
+    from session_store import SqliteSessionStore
+
+    user = "whatsapp:+910000000602"
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(app, "user_sessions", store)
+    history = ConversationHistory(app.HISTORY_MAX_TURNS)
+    for role, content in EARLIER:
+        history.append(role, content, 10)
+    store.put(user, Session(history, "en", 4))
+    turns = history.oldest_turns(app.summarizer.keep_turns)
+
+    async def scenario():
+        inbox = asyncio.Queue()
+        await inbox.put({"type": "lifespan.startup"})
+        lifespan = asyncio.create_task(asgi.app({"type": "lifespan"}, inbox.get, lambda message: asyncio.sleep(0)))
+        await asyncio.sleep(0.01)
+        assert app.summarizer.fold_fn is asgi.fold_summary
+
+        async with asgi.user_locks.hold(user):
+            # The summary finishes while a message from the user is being answered.
+            fold = asyncio.create_task(asyncio.to_thread(app.summarizer.fold_fn, user, history, turns, SUMMARY, 20))
+            await asyncio.sleep(0.05)
+            assert not fold.done()
+            state = store.get(user)
+            state.history.append("user", "The fever is still there today", 10)
+            store.put(user, state)
+        await fold
+
+        await inbox.put({"type": "lifespan.shutdown"})
+        await lifespan
+
+    asyncio.run(scenario())
+    assert app.summarizer.fold_fn is app.fold_summary
+    history = store.get(user).history
+    assert history.summary == SUMMARY
+    assert [content for _, content, _ in history.oldest_turns(0)] == [
+        content for _, content in EARLIER[-app.summarizer.keep_turns:]
+    ] + ["The fever is still there today"]
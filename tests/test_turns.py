@@ -0,0 +1,105 @@
+import threading
+
+import app
+from jobs import JobQueue
+
+
+def test_goodbye_waits_for_running_turn(monkeypatch):
+    user = "whatsapp:+910000000101"
+    asking, answer = threading.Event(), threading.Event()
+
+    def slow_openai(history, message, lang, paragraphs=None, deadline=None):
+        asking.set()
+        answer.wait(5)
+        return "Drink fluids and rest."
+
+    monkeypatch.setattr(app, "ask_openai", slow_openai)
+    question = threading.Thread(target=app.process_message, args=(user, "I have a fever"))
+    question.start()
+    assert asking.wait(5)
+
+    # An emergency is answered at once, without saving over the running turn.
+    assert app.EMERGENCY_MESSAGE["en"] in app.process_message(user, "he had seizures")
+
+    goodbye = threading.Thread(target=app.process_message, args=(user, "bye"))
+    goodbye.start()
+    goodbye.join(0.2)
+    assert goodbye.is_alive()  # queued behind the question
+
+    answer.set()
+    question.join(5)
+    goodbye.join(5)
+    assert app.user_sessions.get(user) is None
+
+
+class SlowOpenAI:
+    """Stands in for ask_openai; every call waits until release is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self._cond = threading.Condition()
+
+    def __call__(self, history, message, lang, paragraphs=None, deadline=None):
+        with self._cond:
+            self.calls += 1
+            self._cond.notify_all()
+        self.release.wait(5)
+        reply = f"Answer to: {message}"
+        history.append("assistant", reply, 5)
+        return reply
+
+    def wait_for(self, calls):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.calls >= calls, 5)
+
+
+def post(client, user, body, sid):
+    client.post("/whatsapp", data={"MessageSid": sid, "From": user, "To": "whatsapp:+14155238886", "Body": body})
+
+
+def test_emergency_is_not_stuck_behind_waiting_goodbyes(monkeypatch, fake_twilio):
+    slow = SlowOpenAI()
+    monkeypatch.setattr(app, "ASYNC_REPLIES", True)
+    monkeypatch.setattr(app, "ask_openai", slow)
+    client = app.app.test_client()
+    users = ["whatsapp:+910000000701", "whatsapp:+910000000702"]
+    for i, user in enumerate(users):
+        post(client, user, f"My back hurts since {i + 2} days", f"SM70{i}q")
+    assert slow.wait_for(2)
+    for i, user in enumerate(users):
+        post(client, user, "thanks", f"SM70{i}b")
+
+    post(client, "whatsapp:+910000000703", "my father has chest pain", "SM703")
+    (_, to, _, body), = fake_twilio.messages(1)
+    assert to == "whatsapp:+910000000703"
+    assert app.EMERGENCY_MESSAGE["en"] in body
+    assert slow.calls == 2  # the questions are still being answered
+
+    slow.release.set()
+    sent = fake_twilio.messages(5)
+    for user in users:
+        bodies = [body for _, to, _, body in sent if to == user]
+        assert bodies[0].startswith("Answer to:")
+        assert bodies[1] == "Conversation ended. You can message again anytime."
+        assert app.user_sessions.get(user) is None
+
+
+def test_goodbye_queued_behind_question_is_answered_after_it(monkeypatch, fake_twilio):
+    slow = SlowOpenAI()
+    monkeypatch.setattr(app, "ASYNC_REPLIES", True)
+    monkeypatch.setattr(app, "ask_openai", slow)
+    monkeypatch.setattr(app, "reply_jobs", JobQueue(workers=1, name="test-reply"))
+    client = app.app.test_client()
+    post(client, "whatsapp:+910000000711", "I sprained my ankle", "SM711")
+    assert slow.wait_for(1)  # the only worker is busy
+
+    user = "whatsapp:+910000000712"
+    post(client, user, "my child has fever", "SM712")
+    post(client, user, "ok thanks bye", "SM713")
+    slow.release.set()
+    app.reply_jobs.join()
+
+    bodies = [body for _, to, _, body in fake_twilio.messages(3) if to == user]
+    assert bodies == ["Answer to: my child has fever", "Conversation ended. You can message again anytime."]
+    assert app.user_sessions.get(user) is None